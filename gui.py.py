@@ -2,6 +2,7 @@ import sys
 import os
 import json
 import logging
+import logging.handlers
 import smtplib
 import io
 import pandas as pd
@@ -9,6 +10,14 @@ import html
 import datetime
 import re
 import base64
+import hashlib
+import threading
+import contextlib
+import importlib.util
+import queue
+import atexit
+import gzip
+import time
 import requests # Add this import for downloading the default image
 import webbrowser # Add this import to open web links
 
@@ -30,11 +39,22 @@ from googleapiclient import errors
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseDownload, build_http
+from google_auth_httplib2 import AuthorizedHttp
 import shutil
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+# Log writers lock a shared file so the headless script and the GUI can rotate automation.log safely
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Optional: python-calamine (pandas >= 2.2) parses .xlsx much faster than openpyxl
+HAS_CALAMINE = importlib.util.find_spec('python_calamine') is not None and tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+
 
 # --- Configuration ---
 load_dotenv()
@@ -43,6 +63,10 @@ CONFIG_FILE = 'task_log.json'
 TOKEN_FILE = 'token.json'
 CREDENTIALS_FILE = 'credentials.json'
 LOGFILE = 'automation.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024 # automation.log is rotated when it reaches this size...
+LOG_MAX_AGE_DAYS = 7 # ...or when its current segment is this old
+LOG_BACKUP_COUNT = 5 # Rotated segments kept, gzip-compressed: automation.log.1.gz (newest) to automation.log.5.gz
+LOG_TAIL_BYTES = 512 * 1024 # The Activity Log tab shows only the end of the log file
 DEFAULT_BG_FILE = 'b.jpg' # Filename for the default background
 SMTP_EMAIL = os.environ.get('AUTOMATION_SMTP_EMAIL')
 SMTP_PASSWORD = os.environ.get('AUTOMATION_SMTP_PASSWORD')
@@ -50,8 +74,90 @@ GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 SMTP_SERVER = 'smtp.gmail.com'
 SMTP_PORT = 465
 SCOPES = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/forms.body']
+# pandas' openpyxl engine already opens workbooks in read-only mode; calamine is preferred when installed
+EXCEL_ENGINE = 'calamine' if HAS_CALAMINE else 'openpyxl'
+CATEGORY_COLUMNS = ['Location', 'SPOC'] # Low-cardinality columns stored as categoricals to save memory
+FORMS_MAX_REQUEST_BYTES = 512 * 1024 # Upper bound for one batchUpdate body; bigger updates are spread over several calls
+
+class SharedRotatingFileHandler(logging.FileHandler):
+    """Appends to the log file shared with the headless script, rotating it by size or age.
+
+    Writers in both processes take a lock file around each write. Rotation compresses the file into
+    automation.log.1.gz and truncates it in place rather than renaming it, so the other process's
+    append-mode handle carries on at the start of the new segment (renaming an open file also fails
+    on Windows). The lock file's mtime marks when the current segment was started.
+    """
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, max_age_days=LOG_MAX_AGE_DAYS, backup_count=LOG_BACKUP_COUNT):
+        super().__init__(filename, encoding='utf-8')
+        self.max_bytes, self.max_age_seconds, self.backup_count = max_bytes, max_age_days * 86400, backup_count
+        self.lock_path = self.baseFilename + '.lock'
+        self._lock_file = open(self.lock_path, 'a+')
+
+    @contextlib.contextmanager
+    def interprocess_lock(self):
+        fd = self._lock_file.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass # LK_LOCK gives up after 10 seconds; keep waiting, the other writer is still busy
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
 
-logging.basicConfig(filename=LOGFILE, level=logging.INFO, format='%(asctime)s - GUI - %(levelname)s - %(message)s')
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            with self.interprocess_lock():
+                size = os.fstat(self.stream.fileno()).st_size
+                if size >= self.max_bytes or (size and time.time() - os.stat(self.lock_path).st_mtime >= self.max_age_seconds):
+                    self.rotate()
+                self.stream.write(message)
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def rotate(self):
+        """Moves the current segment into the compressed backups. Must be called with the lock held."""
+        self.stream.flush()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.baseFilename}.{index}.gz"):
+                    os.replace(f"{self.baseFilename}.{index}.gz", f"{self.baseFilename}.{index + 1}.gz")
+            with open(self.baseFilename, 'rb') as source, gzip.open(f"{self.baseFilename}.1.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+        self.stream.truncate(0)
+        os.utime(self.lock_path)
+
+    def close(self):
+        super().close()
+        self._lock_file.close()
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the log writer thread; the message is merged now, as its arguments may change later."""
+    def prepare(self, record):
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+# Records are queued and written by a background thread, so logging never blocks the UI on the disk
+_file_handler = SharedRotatingFileHandler(LOGFILE)
+_file_handler.setFormatter(logging.Formatter('%(asctime)s - GUI - %(levelname)s - %(message)s'))
+LOG_QUEUE = queue.Queue()
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, _file_handler)
+logging.basicConfig(level=logging.INFO, handlers=[LogQueueHandler(LOG_QUEUE)])
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
 
 # --- Base64 Embedded Assets ---
 # A simple loading spinner GIF
@@ -116,6 +222,50 @@ def get_creds():
             token.write(creds.to_json())
     return creds
 
+_idle_services = {} # (api, version) -> [(service, http)] not currently lent to a worker
+_lent_services = {} # id(service) -> http of each client currently lent out
+_idle_services_lock = threading.Lock()
+
+def borrow_google_service(api, version, creds):
+    """Lends a cached Google API client to one worker at a time; hand it back with return_google_service().
+
+    Clients are built from the bundled static discovery documents and keep their keep-alive
+    connections between button clicks; they are not thread-safe, so a client is never shared
+    by two running workers.
+    """
+    with _idle_services_lock:
+        idle = _idle_services.setdefault((api, version), [])
+        service, http = idle.pop() if idle else (None, None)
+    if service is None:
+        http = AuthorizedHttp(creds, http=build_http())
+        service = build(api, version, http=http, cache_discovery=False, static_discovery=True)
+    http.credentials = creds
+    with _idle_services_lock:
+        _lent_services[id(service)] = http
+    return service
+
+def return_google_service(api, version, service):
+    with _idle_services_lock:
+        _idle_services[(api, version)].append((service, _lent_services.pop(id(service))))
+
+@contextlib.contextmanager
+def google_service(api, version, creds):
+    """borrow_google_service() as a context manager."""
+    service = borrow_google_service(api, version, creds)
+    try:
+        yield service
+    finally:
+        return_google_service(api, version, service)
+
+def load_excel(filepath, columns=None):
+    """Parses the first sheet of a workbook, keeping only `columns` (all columns if None)."""
+    usecols = (lambda name: name in columns) if columns else None
+    df = pd.read_excel(filepath, usecols=usecols, engine=EXCEL_ENGINE)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
 def load_config():
     if os.path.exists(CONFIG_FILE):
         try:
@@ -150,6 +300,114 @@ def format_markdown_to_html(text):
         formatted_lines.append('</ol>')
     return '<br>'.join(formatted_lines).replace('<br><ol>', '<ol>').replace('</ol><br>', '</ol>')
 
+def read_log_tail(path, max_bytes=LOG_TAIL_BYTES):
+    """Returns the lines in the last `max_bytes` of a log file, dropping the partial first line."""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - max_bytes))
+        lines = f.read().decode('utf-8', errors='replace').splitlines()
+    return lines[1:] if size > max_bytes else lines
+
+LOG_LEVELS = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+SPAN_FIELDS = {'time', 'source', 'level', 'message', 'event', 'span', 'span_id', 'parent_id', 'start', 'duration_ms', 'outcome'}
+
+def parse_log_line(line):
+    """Returns (display text, level) for one log line, either plain text or a JSON record from the headless log.
+
+    Span records get the level 'SPAN', or 'ERROR' when they failed. Traceback lines have no level.
+    """
+    if line.startswith('{'):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return line, None
+        if entry.get('event') != 'span':
+            text = f"{entry.get('time')} - {entry.get('source')} - {entry.get('level')} - {entry.get('message')}"
+            if entry.get('exception'): text += '\n' + entry['exception']
+            return text, entry.get('level')
+        extras = ', '.join(f"{key}={value}" for key, value in entry.items() if key not in SPAN_FIELDS)
+        text = f"{entry.get('time')} - {entry.get('source')} - SPAN - {entry.get('message')}" + (f" ({extras})" if extras else '')
+        return text, 'ERROR' if entry.get('outcome') == 'error' else 'SPAN'
+    # Plain lines look like "<time> - <source> - <level> - <message>" (or "<time> - <level> - ..." after a clear)
+    parts = line.split(' - ', 3)
+    level = next((part for part in parts[1:3] if part in LOG_LEVELS), None)
+    return line, level
+
+
+def get_dropdown_options(df, field_mappings):
+    """Returns {question title: [option values]} for every mapped column that has data."""
+    options = {}
+    for form_title, excel_column in field_mappings.items():
+        if excel_column not in df.columns: logging.warning(f"Column '{excel_column}' not in Excel. Skipping '{form_title}'."); continue
+        # Forms rejects duplicate options, so de-duplicate on the string value while keeping sheet order
+        options_list = list(dict.fromkeys(str(opt) for opt in df[excel_column].dropna().unique().tolist()))
+        if not options_list: logging.warning(f"No data in column '{excel_column}'. Skipping '{form_title}'."); continue
+        options[form_title] = options_list
+    return options
+
+def get_options_fingerprint(options):
+    return hashlib.sha256(json.dumps(options).encode('utf-8')).hexdigest()
+
+def get_current_options(item):
+    """Returns the option values of a dropdown question, or None if the item is not a dropdown."""
+    choice_question = item.get('questionItem', {}).get('question', {}).get('choiceQuestion', {})
+    if choice_question.get('type') != 'DROP_DOWN':
+        return None
+    return [option.get('value') for option in choice_question.get('options', [])]
+
+def build_form_index(form):
+    """Indexes a form's questions by lower-cased title, keeping what an updateItem request needs."""
+    questions = {}
+    for i, item in enumerate(form.get('items', [])):
+        title_key = item.get('title', '').strip().lower()
+        question = item.get('questionItem', {}).get('question')
+        if not question or title_key in questions: continue
+        options = get_current_options(item)
+        questions[title_key] = {
+            'itemId': item.get('itemId'), 'questionId': question.get('questionId'), 'index': i, 'title': item.get('title'),
+            'options_fingerprint': get_options_fingerprint(options) if options is not None else None
+        }
+    return {'revision_id': form.get('revisionId'), 'questions': questions}
+
+def build_dropdown_requests(form_index, desired_options):
+    """Builds updateItem requests for the questions whose current options differ from `desired_options`.
+
+    Returns (requests, updated question titles, titles of all questions found in the form).
+    """
+    requests, updated_fields, matched_fields = [], [], []
+    for form_title, options_list in desired_options.items():
+        question = form_index['questions'].get(form_title.lower())
+        if not question: logging.warning(f"Question '{form_title}' not in form. Skipping."); continue
+        matched_fields.append(form_title)
+        if question['options_fingerprint'] == get_options_fingerprint(options_list): continue
+        dropdown_options = [{'value': opt} for opt in options_list]
+        new_item_body = {
+            'itemId': question['itemId'], 'title': question['title'],
+            'questionItem': {'question': {
+                'questionId': question['questionId'],
+                'required': True,
+                'choiceQuestion': {'type': 'DROP_DOWN', 'options': dropdown_options, 'shuffle': False}
+            }}}
+        request = {'updateItem': {'item': new_item_body, 'location': {'index': question['index']}, 'updateMask': 'questionItem'}}
+        requests.append(request)
+        updated_fields.append(form_title)
+    return requests, updated_fields, matched_fields
+
+def chunk_requests(requests, max_bytes=None):
+    """Splits requests into batches whose JSON size stays under `max_bytes` (an oversized request goes alone)."""
+    max_bytes = max_bytes or FORMS_MAX_REQUEST_BYTES
+    chunks, current, current_size = [], [], 0
+    for request in requests:
+        request_size = len(json.dumps(request))
+        if current and current_size + request_size > max_bytes:
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(request)
+        current_size += request_size
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 # --- Loading Overlay Widget ---
 class LoadingOverlay(QWidget):
@@ -277,7 +535,7 @@ class EmailWorker(QObject):
     def process(self):
         """Executes the email sending task. Renamed from 'run' for clarity."""
         try:
-            df = pd.read_excel(self.task["excel"])
+            df = load_excel(self.task["excel"], ['Email', 'Email ID'])
         except FileNotFoundError:
             self.finished.emit('error', f"Excel file not found at: {self.task['excel']}")
             return
@@ -322,8 +580,9 @@ class DriveWorker(QObject):
     @pyqtSlot()
     def process(self):
         """Executes the drive download task. Renamed from 'run' for clarity."""
+        drive_service = None
         try:
-            drive_service = build('drive', 'v3', credentials=self.creds)
+            drive_service = borrow_google_service('drive', 'v3', self.creds)
             os.makedirs(self.path, exist_ok=True)
             results = drive_service.files().list(q=f"'{self.folder_id}' in parents and trashed=false", fields="files(id, name, mimeType)").execute()
             items = results.get('files', [])
@@ -369,6 +628,8 @@ class DriveWorker(QObject):
             self.finished.emit('error', f"API Error: {e}. Check permissions and folder link.")
         except Exception as e:
             self.finished.emit('error', f"Download failed: {e}")
+        finally:
+            if drive_service is not None: return_google_service('drive', 'v3', drive_service)
             
     def stop(self): self.is_running = False
 
@@ -395,9 +656,10 @@ class TrackerWorker(QObject):
     @pyqtSlot()
     def process(self):
         """Executes the tracker generation task. Renamed from 'run' for clarity."""
+        service = None
         try:
             sheet_id = get_google_id_from_url(self.task["response_sheet_id"])
-            service = build('sheets', 'v4', credentials=self.creds)
+            service = borrow_google_service('sheets', 'v4', self.creds)
 
             spreadsheet_metadata = service.spreadsheets().get(spreadsheetId=sheet_id).execute()
             sheets = spreadsheet_metadata.get('sheets', [])
@@ -426,7 +688,7 @@ class TrackerWorker(QObject):
             required_master_cols = ['Email ID', 'Location', 'SPOC']
             required_response_cols = ['Email', 'Location', 'Upload the Applicable Documents']
             
-            df_master = pd.read_excel(self.task["master_excel"])
+            df_master = load_excel(self.task["master_excel"], required_master_cols)
             if not all(col in df_master.columns for col in required_master_cols):
                 self.finished.emit('error', f"Master Excel missing columns: {required_master_cols}"); return
             if not all(col in df_response.columns for col in required_response_cols):
@@ -542,6 +804,8 @@ class TrackerWorker(QObject):
             self.finished.emit('error', f"File not found: {e.filename}")
         except Exception as e:
             if self.is_running: self.finished.emit('error', f"Failed to generate tracker: {e}")
+        finally:
+            if service is not None: return_google_service('sheets', 'v4', service)
 
     def stop(self): self.is_running = False
 
@@ -558,38 +822,26 @@ class FormWorker(QObject):
     def process(self):
         """Executes the form update task. Renamed from 'run' for clarity."""
         try:
-            df = pd.read_excel(self.excel_path)
             field_mappings = {'Location': 'Location', 'Email': 'Email ID', 'SPOC Name': 'SPOC'}
-            forms_service = build('forms', 'v1', credentials=self.creds)
-            form = forms_service.forms().get(formId=self.form_id).execute()
-            form_items = form.get('items', [])
-            requests, updated_fields = [], []
-            for form_title, excel_column in field_mappings.items():
+            df = load_excel(self.excel_path, list(field_mappings.values()))
+            with google_service('forms', 'v1', self.creds) as forms_service:
+                form = forms_service.forms().get(formId=self.form_id).execute()
                 if not self.is_running: self.finished.emit('error', "Operation cancelled."); return
-                if excel_column not in df.columns: logging.warning(f"Column '{excel_column}' not in Excel. Skipping '{form_title}'."); continue
-                options_list = df[excel_column].dropna().unique().tolist()
-                if not options_list: logging.warning(f"No data in column '{excel_column}'. Skipping '{form_title}'."); continue
-                target_item, target_index = None, -1
-                for i, item in enumerate(form_items):
-                    if item.get('title', '').strip().lower() == form_title.lower():
-                        target_item, target_index = item, i; break
-                if not target_item: logging.warning(f"Question '{form_title}' not in form. Skipping."); continue
-                dropdown_options = [{'value': str(opt)} for opt in options_list]
-                new_item_body = {
-                    'itemId': target_item.get('itemId'), 'title': target_item.get('title'),
-                    'questionItem': {'question': {
-                        'questionId': target_item['questionItem']['question']['questionId'],
-                        'required': True,
-                        'choiceQuestion': {'type': 'DROP_DOWN', 'options': dropdown_options, 'shuffle': False}
-                    }}}
-                request = {'updateItem': {'item': new_item_body, 'location': {'index': target_index}, 'updateMask': 'questionItem'}}
-                requests.append(request)
-                updated_fields.append(form_title)
-            if not requests: self.finished.emit('error', "No matching questions or data to update."); return
-            body = {'requests': requests}
-            forms_service.forms().batchUpdate(formId=self.form_id, body=body).execute()
-            if self.is_running:
-                self.finished.emit('success', f"Successfully updated dropdowns for: {', '.join(updated_fields)}.")
+                desired_options = get_dropdown_options(df, field_mappings)
+                # Only questions whose options actually differ from the live form are sent
+                form_index = build_form_index(form)
+                requests, updated_fields, matched_fields = build_dropdown_requests(form_index, desired_options)
+                if matched_fields and not requests: self.finished.emit('success', "Form dropdowns are already up to date."); return
+                if not requests: self.finished.emit('error', "No matching questions or data to update."); return
+                # Large option lists are sent over several size-bounded calls, each pinned to the revision it was built from
+                revision_id = form_index['revision_id']
+                for chunk in chunk_requests(requests):
+                    if not self.is_running: self.finished.emit('error', "Operation cancelled."); return
+                    body = {'requests': chunk, 'writeControl': {'requiredRevisionId': revision_id}} if revision_id else {'requests': chunk}
+                    response = forms_service.forms().batchUpdate(formId=self.form_id, body=body).execute()
+                    revision_id = response.get('writeControl', {}).get('requiredRevisionId')
+                if self.is_running:
+                    self.finished.emit('success', f"Successfully updated dropdowns for: {', '.join(updated_fields)}.")
         except errors.HttpError as e: self.finished.emit('error', f"Google Forms API Error: {e}. Check permissions.")
         except FileNotFoundError as e: self.finished.emit('error', f"Master Excel file not found: {e.filename}")
         except Exception as e:
@@ -842,18 +1094,17 @@ class AutomationApp(QWidget):
     def load_log_file(self):
         if not os.path.exists(LOGFILE): self.log_display.setText("Log file not found."); return
         try:
-            with open(LOGFILE, 'r') as f: log_content = f.readlines()
+            log_content = read_log_tail(LOGFILE)
             html_content = ""
+            level_colors = {'ERROR': "#e74c3c", 'CRITICAL': "#e74c3c", 'WARNING': "#f39c12", 'INFO': "#2ecc71", 'SPAN': "#5dade2"}
             for line in reversed(log_content):
-                safe_line = html.escape(line).strip()
+                text, level = parse_log_line(line.strip())
+                safe_line = html.escape(text).replace('\n', '<br>')
                 if not safe_line: continue
                 
-                color = "#d0d0d0"
-                if "ERROR" in line or "CRITICAL" in line: color = "#e74c3c"
-                elif "WARNING" in line: color = "#f39c12"
-                elif "INFO" in line: color = "#2ecc71"
+                color = level_colors.get(level, "#d0d0d0")
                 
-                html_content += f'<p style="color:{color}; margin: 2px 0;">{safe_line.replace(os.linesep, "<br>")}</p>'
+                html_content += f'<p style="color:{color}; margin: 2px 0;">{safe_line}</p>'
                 
             self.log_display.setHtml(f"<html><body style='font-family: Consolas, monospace; font-size: 9pt;'>{html_content}</body></html>")
             self.log_display.verticalScrollBar().setValue(0)
@@ -863,7 +1114,7 @@ class AutomationApp(QWidget):
         reply = QMessageBox.question(self, 'Confirm Clear', "Are you sure you want to permanently clear the log file?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                with open(LOGFILE, 'w') as f: f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - INFO - Log file cleared by user.\n")
+                with _file_handler.interprocess_lock(), open(LOGFILE, 'w', encoding='utf-8') as f: f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - INFO - Log file cleared by user.\n")
                 self.load_log_file()
             except Exception as e: self.show_error(f"Could not clear log file: {e}")
 
@@ -1144,6 +1395,7 @@ class AutomationApp(QWidget):
         grid.addWidget(QLabel("Response Sheet URL or ID:"), 2, 0); self.response_sheet_id = QLineEdit(); grid.addWidget(self.response_sheet_id, 2, 1, 1, 2)
         grid.addWidget(QLabel("Save Tracker Excel File:"), 3, 0); self.tracker_output_path = QLineEdit(); grid.addWidget(self.tracker_output_path, 3, 1)
         out_browse = QPushButton("Save As"); out_browse.clicked.connect(lambda: self.tracker_output_path.setText(QFileDialog.getSaveFileName(self, "Save Tracker Excel", "", "Excel Files (*.xlsx)")[0])); grid.addWidget(out_browse, 3, 2)
+        grid.addWidget(QLabel("Output Formats:"), 4, 0); self.tracker_output_formats = QLineEdit(); self.tracker_output_formats.setPlaceholderText("xlsx (default) — comma-separated: xlsx, csv, parquet, json"); grid.addWidget(self.tracker_output_formats, 4, 1, 1, 2)
         grid.setColumnStretch(1, 1)
         layout.addLayout(grid)
         buttons_layout = QHBoxLayout(); save_btn = QPushButton("Save/Update Tracker Task"); save_btn.clicked.connect(self.save_tracker_task); delete_btn = QPushButton("Delete Tracker Task"); delete_btn.setObjectName("DeleteButton"); delete_btn.clicked.connect(self.delete_tracker_task); buttons_layout.addWidget(save_btn); buttons_layout.addWidget(delete_btn); layout.addLayout(buttons_layout)
@@ -1255,7 +1507,8 @@ class AutomationApp(QWidget):
     def save_tracker_task(self):
         title, master_path, response_sheet, out_path = self.track_title.text().strip(), self.master_excel_path.text().strip(), self.response_sheet_id.text().strip(), self.tracker_output_path.text().strip()
         if not all([title, master_path, response_sheet, out_path]): self.show_error("Title, master excel, response sheet, and tracker save path are required."); return
-        task = { "title": title, "master_excel": master_path, "response_sheet_id": response_sheet, "result_path": out_path, "type": "tracker" }
+        output_formats = [fmt.strip().lower() for fmt in self.tracker_output_formats.text().split(',') if fmt.strip()] or ["xlsx"]
+        task = { "title": title, "master_excel": master_path, "response_sheet_id": response_sheet, "result_path": out_path, "output_formats": output_formats, "type": "tracker" }
         tasks = self.config.setdefault("track_tasks", []); self.config["track_tasks"] = [t for t in tasks if t.get("title") != title]; self.config["track_tasks"].append(task)
         self.save_and_reload(); QMessageBox.information(self, "Saved", "Tracker task saved.")
         self.track_select_combo.setCurrentText(title)
@@ -1303,9 +1556,9 @@ class AutomationApp(QWidget):
         title = self.track_select_combo.currentText()
         obj = next((t for t in self.config.get("track_tasks", []) if t.get("title") == title), None)
         if obj:
-            self.track_title.setText(obj.get("title", "")); self.master_excel_path.setText(obj.get("master_excel", "")); self.response_sheet_id.setText(obj.get("response_sheet_id", "")); self.tracker_output_path.setText(obj.get("result_path", ""))
+            self.track_title.setText(obj.get("title", "")); self.master_excel_path.setText(obj.get("master_excel", "")); self.response_sheet_id.setText(obj.get("response_sheet_id", "")); self.tracker_output_path.setText(obj.get("result_path", "")); self.tracker_output_formats.setText(", ".join(obj.get("output_formats", [])))
         else:
-            self.track_title.clear(); self.master_excel_path.clear(); self.response_sheet_id.clear(); self.tracker_output_path.clear()
+            self.track_title.clear(); self.master_excel_path.clear(); self.response_sheet_id.clear(); self.tracker_output_path.clear(); self.tracker_output_formats.clear()
     def generate_tracker_click(self):
         if self.thread and self.thread.isRunning(): self.show_error("A task is already running."); return
         response_input = self.response_sheet_id.text().strip()
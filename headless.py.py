@@ -2,6 +2,7 @@ import sys
 import os
 import json
 import logging
+import logging.handlers
 import smtplib
 import io
 import pandas as pd
@@ -9,6 +10,33 @@ import datetime
 import time
 import hashlib
 import re
+import threading
+import queue
+import heapq
+import itertools
+import functools
+import contextlib
+import importlib.util
+import multiprocessing
+import sqlite3
+import socket
+import uuid
+import atexit
+import random
+import email.utils
+import asyncio
+import contextvars
+import signal
+import argparse
+import http.server
+import cProfile
+import pstats
+import tracemalloc
+import gzip
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 
 # --- Third-party libraries ---
 # Make sure to install them: pip install pandas openpyxl google-api-python-client google-auth-oauthlib google-auth-httplib2 python-dotenv
@@ -20,9 +48,33 @@ from googleapiclient.discovery import build
 from googleapiclient import errors
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseDownload, build_http
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from dotenv import load_dotenv
 
+# Optional: pyarrow enables the columnar sidecar cache for parsed workbooks
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Optional: watchdog delivers file change events (inotify and friends) instead of stat polling
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# Log writers lock a shared file so the GUI and this script can rotate automation.log safely
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Optional: python-calamine (pandas >= 2.2) parses .xlsx much faster than openpyxl
+HAS_CALAMINE = importlib.util.find_spec('python_calamine') is not None and tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+
 # --- Configuration ---
 # This section should mirror the GUI's configuration
 load_dotenv()
@@ -32,6 +84,9 @@ STATE_FILE = 'headless_state.json' # Stores last run times and states
 TOKEN_FILE = 'token.json'
 CREDENTIALS_FILE = 'credentials.json'
 LOGFILE = 'automation.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024 # automation.log is rotated when it reaches this size...
+LOG_MAX_AGE_DAYS = 7 # ...or when its current segment is this old
+LOG_BACKUP_COUNT = 5 # Rotated segments kept, gzip-compressed: automation.log.1.gz (newest) to automation.log.5.gz
 
 SMTP_EMAIL = os.environ.get('AUTOMATION_SMTP_EMAIL')
 SMTP_PASSWORD = os.environ.get('AUTOMATION_SMTP_PASSWORD')
@@ -39,44 +94,739 @@ SMTP_SERVER = 'smtp.gmail.com'
 SMTP_PORT = 465
 SCOPES = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/forms.body']
 
+class SharedRotatingFileHandler(logging.FileHandler):
+    """Appends to the log file shared with the GUI, rotating it by size or age.
+
+    Writers in both processes take a lock file around each write. Rotation compresses the file into
+    automation.log.1.gz and truncates it in place rather than renaming it, so the other process's
+    append-mode handle carries on at the start of the new segment (renaming an open file also fails
+    on Windows). The lock file's mtime marks when the current segment was started.
+    """
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, max_age_days=LOG_MAX_AGE_DAYS, backup_count=LOG_BACKUP_COUNT):
+        super().__init__(filename, encoding='utf-8')
+        self.max_bytes, self.max_age_seconds, self.backup_count = max_bytes, max_age_days * 86400, backup_count
+        self.lock_path = self.baseFilename + '.lock'
+        self._lock_file = open(self.lock_path, 'a+')
+
+    @contextlib.contextmanager
+    def interprocess_lock(self):
+        fd = self._lock_file.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass # LK_LOCK gives up after 10 seconds; keep waiting, the other writer is still busy
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            with self.interprocess_lock():
+                size = os.fstat(self.stream.fileno()).st_size
+                if size >= self.max_bytes or (size and time.time() - os.stat(self.lock_path).st_mtime >= self.max_age_seconds):
+                    self.rotate()
+                self.stream.write(message)
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def rotate(self):
+        """Moves the current segment into the compressed backups. Must be called with the lock held."""
+        self.stream.flush()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.baseFilename}.{index}.gz"):
+                    os.replace(f"{self.baseFilename}.{index}.gz", f"{self.baseFilename}.{index + 1}.gz")
+            with open(self.baseFilename, 'rb') as source, gzip.open(f"{self.baseFilename}.1.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+        self.stream.truncate(0)
+        os.utime(self.lock_path)
+
+    def close(self):
+        super().close()
+        self._lock_file.close()
+
+class LogFileFormatter(logging.Formatter):
+    """Formats records in the log format that was active when they were logged: a plain text line, or
+    a single line of JSON in which span records carry their timing fields too."""
+    def format(self, record):
+        if getattr(record, 'log_format', 'text') != 'json':
+            return super().format(record)
+        entry = {'time': self.formatTime(record), 'source': 'HEADLESS', 'level': record.levelname, 'message': record.getMessage()}
+        entry.update(getattr(record, 'span', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the log writer thread.
+
+    The message is merged now, as its arguments may change later, and the record is stamped with the
+    current log format so a format switch only applies to records logged after it.
+    """
+    def prepare(self, record):
+        record.msg, record.args = record.getMessage(), None
+        record.log_format = _log_format
+        return record
+
 # Setup logging to append to the same log file as the GUI
 # Add a handler to also print logs to the console for immediate feedback
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - HEADLESS - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGFILE),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Records are queued and written by a background thread, so logging never blocks on the disk
+LOG_FORMAT = '%(asctime)s - HEADLESS - %(levelname)s - %(message)s'
+_log_format = 'text' # 'text' or 'json', see configure_log_format()
+_file_handler = SharedRotatingFileHandler(LOGFILE)
+_file_handler.setFormatter(LogFileFormatter(LOG_FORMAT))
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+_console_handler.addFilter(lambda record: not hasattr(record, 'span')) # Span records only go to the log file
+LOG_QUEUE = queue.Queue()
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, _file_handler, _console_handler, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[LogQueueHandler(LOG_QUEUE)])
+LOG_LISTENER.start()
+_log_listener_stopped = False
+
+def stop_log_listener():
+    """Writes out the records still queued and stops the log writer thread (only once)."""
+    global _log_listener_stopped
+    if not _log_listener_stopped:
+        _log_listener_stopped = True
+        LOG_LISTENER.stop()
+
+atexit.register(stop_log_listener)
+# Process-pool workers leave through os._exit, which skips atexit but runs multiprocessing finalizers
+multiprocessing.util.Finalize(None, stop_log_listener, exitpriority=0)
+
+# --- Structured Logging ---
+# With 'log_format': 'json' in settings, the log file gets one JSON object per line, and every cycle,
+# task, Google API call and file write is logged as a span with its start, duration and outcome.
+LOG_FORMATS = ('text', 'json')
+SPAN_LOGGER = logging.getLogger('headless.spans')
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+def configure_log_format(log_format):
+    """Switches the log file between the plain 'text' lines shared with the GUI and 'json' records."""
+    global _log_format
+    if log_format not in LOG_FORMATS:
+        logging.warning(f"Unknown log_format '{log_format}'. Expected one of {', '.join(LOG_FORMATS)}.")
+        return
+    _log_format = log_format
+
+@contextlib.contextmanager
+def log_span(name, **fields):
+    """Times the enclosed block and, in the 'json' log format, logs it as one span record.
+
+    The yielded dict takes extra fields such as byte or row counts, or an explicit 'outcome';
+    otherwise the outcome is 'ok', 'timeout' or 'error' depending on how the block exits.
+    """
+    if _log_format != 'json':
+        yield fields
+        return
+    parent = _current_span.get()
+    span = {'event': 'span', 'span': name, 'span_id': uuid.uuid4().hex[:16], 'parent_id': parent and parent['span_id'], **fields}
+    token = _current_span.set(span)
+    started_at, started = time.time(), time.perf_counter()
+    try:
+        yield span
+    except TaskTimeout:
+        span.setdefault('outcome', 'timeout')
+        raise
+    except BaseException:
+        span.setdefault('outcome', 'error')
+        raise
+    finally:
+        _current_span.reset(token)
+        span.setdefault('outcome', 'ok')
+        span['start'] = datetime.datetime.fromtimestamp(started_at).isoformat(timespec='milliseconds')
+        span['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        SPAN_LOGGER.info(f"{name} {span['outcome']} in {span['duration_ms']:.0f} ms", extra={'span': span})
+
+def add_span_counts(**counts):
+    """Adds to counters (e.g. emails_sent=1) on the innermost open span, if spans are being logged."""
+    span = _current_span.get()
+    if span is not None:
+        for name, amount in counts.items():
+            span[name] = span.get(name, 0) + amount
+
+# --- Metrics ---
+METRICS_HOST = '127.0.0.1' # The metrics endpoint only listens locally; set 'metrics_port' in settings to enable it
+METRIC_DEFINITIONS = {
+    'headless_cycle_duration_seconds': ('summary', 'Time taken to run one batch of due tasks.'),
+    'headless_handler_duration_seconds': ('summary', 'Time taken by task runs, per handler.'),
+    'headless_task_duration_seconds': ('summary', 'Time taken by task runs, per task.'),
+    'headless_task_runs_total': ('counter', 'Task runs by handler and outcome.'),
+    'headless_emails_total': ('counter', 'Emails handed to the SMTP server, by outcome.'),
+    'headless_drive_downloaded_bytes_total': ('counter', 'Bytes downloaded from Google Drive.'),
+    'headless_state_save_duration_seconds': ('summary', 'Time taken to write changed task state to the state store.'),
+    'headless_api_calls_total': ('counter', 'Google API requests sent, per API.'),
+    'headless_api_retries_total': ('counter', 'Google API requests retried after a transient error, per API.'),
+    'headless_api_failures_total': ('counter', 'Google API requests that failed for good, per API.'),
+    'headless_api_throttle_wait_seconds_total': ('counter', 'Time spent waiting for the per-API rate limiter.'),
+    'headless_workbook_cache_requests_total': ('counter', 'Parsed workbook lookups, by result (hit, sidecar, miss).'),
+}
+
+class Metrics:
+    """Thread-safe counters and summaries, rendered in the Prometheus text exposition format."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {} # (name, sorted label items) -> counter value, or [count, sum] for summaries
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._values.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def drain(self):
+        """Returns and resets everything recorded in this process, so a tracker worker can send it back with its result."""
+        with self._lock:
+            values, self._values = self._values, {}
+        with _api_counters_lock:
+            api_counters = {api: dict(counters) for api, counters in API_COUNTERS.items()}
+            API_COUNTERS.clear()
+        return values, api_counters, WORKBOOK_CACHE.take_counts()
+
+    def merge(self, drained):
+        """Adds what drain() returned in another process to this process's metrics."""
+        values, api_counters, cache_counts = drained
+        with self._lock:
+            for key, value in values.items():
+                if isinstance(value, list):
+                    summary = self._values.setdefault(key, [0, 0.0])
+                    summary[0] += value[0]
+                    summary[1] += value[1]
+                else:
+                    self._values[key] = self._values.get(key, 0) + value
+        for api, counters in api_counters.items():
+            for counter, amount in counters.items():
+                count_api_event(api, counter, amount)
+        WORKBOOK_CACHE.add_counts(*cache_counts)
+
+    def render(self):
+        with self._lock:
+            values = {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+        # Counters kept elsewhere are read at scrape time
+        with _api_counters_lock:
+            for api, counters in API_COUNTERS.items():
+                for counter, name in [('calls', 'headless_api_calls_total'), ('retries', 'headless_api_retries_total'), ('failures', 'headless_api_failures_total'), ('throttle_wait_seconds', 'headless_api_throttle_wait_seconds_total')]:
+                    values[(name, (('api', api),))] = counters[counter]
+        for result, count in [('hit', WORKBOOK_CACHE.hits), ('sidecar', WORKBOOK_CACHE.sidecar_hits), ('miss', WORKBOOK_CACHE.misses)]:
+            values[('headless_workbook_cache_requests_total', (('result', result),))] = count
+
+        lines = []
+        for name, (metric_type, help_text) in METRIC_DEFINITIONS.items():
+            samples = sorted((labels, value) for (sample_name, labels), value in values.items() if sample_name == name)
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+            for labels, value in samples:
+                if metric_type == 'summary':
+                    lines += [f"{name}_count{format_metric_labels(labels)} {value[0]}", f"{name}_sum{format_metric_labels(labels)} {value[1]:.6f}"]
+                else:
+                    lines.append(f"{name}{format_metric_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+def format_metric_labels(labels):
+    if not labels:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+METRICS = Metrics()
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Scrapes would otherwise flood the log
+
+_metrics_server = None
+
+def start_metrics_server(port):
+    """Serves METRICS at http://127.0.0.1:<port>/metrics from a background thread (once per process)."""
+    global _metrics_server
+    if _metrics_server is not None:
+        return
+    try:
+        _metrics_server = http.server.ThreadingHTTPServer((METRICS_HOST, int(port)), MetricsRequestHandler)
+    except OSError as e:
+        logging.error(f"Could not start the metrics endpoint on port {port}: {e}")
+        return
+    threading.Thread(target=_metrics_server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.info(f"Serving metrics at http://{METRICS_HOST}:{port}/metrics")
+
+# --- Profiling ---
+PROFILES_DIR = 'profiles' # cProfile and tracemalloc dumps are written here
+PROFILE_TOP_ENTRIES = 40 # Functions and allocation sites listed in the text summaries
+
+class Profiler:
+    """Captures cProfile stats and tracemalloc top allocators for the next few cycles or for one task.
+
+    A profiled cycle profiles each of its task runs in the thread that runs it and merges them into one
+    dump. On Python 3.12+ only one thread can be profiled at a time, so task runs that overlap an already
+    profiled one run unprofiled and are listed in the summary.
+    """
+    def __init__(self):
+        # Plain attributes, armed without a lock so the SIGUSR1 handler can never block the thread it interrupts
+        self.pending_cycles = 0
+        self.pending_task = None
+        self._settings = (0, None)
+        self._session = None
+        self._lock = threading.Lock()
+
+    def request(self, cycles=0, task=None):
+        """Profiles the next `cycles` cycles and/or the next run of the task titled `task`."""
+        if cycles:
+            self.pending_cycles = int(cycles)
+        if task:
+            self.pending_task = task
+
+    def configure(self, settings):
+        """Arms the profiler when the 'profile_cycles' or 'profile_task' settings change."""
+        wanted = (settings.get('profile_cycles', 0), settings.get('profile_task'))
+        if wanted != self._settings:
+            self._settings = wanted
+            self.request(*wanted)
+
+    @contextlib.contextmanager
+    def cycle(self):
+        if not self.pending_cycles:
+            yield
+            return
+        self.pending_cycles -= 1
+        logging.info(f"Profiling this cycle ({self.pending_cycles} more requested).")
+        self._session = self._start_session()
+        try:
+            yield
+        finally:
+            session, self._session = self._session, None
+            self._dump('cycle', session)
+
+    @contextlib.contextmanager
+    def task(self, key):
+        """Profiles a task run that belongs to a profiled cycle or was requested on its own."""
+        session, own_session = self._session, None
+        if self.pending_task is not None and key[1] == self.pending_task:
+            self.pending_task = None
+            logging.info(f"Profiling this run of task '{key[1]}'.")
+            session = own_session = self._start_session()
+        if session is None:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError: # Another thread is being profiled (Python 3.12+)
+            with self._lock:
+                session['skipped'].append(key[1])
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    session['profiles'].append(profile)
+            if own_session is not None:
+                self._dump(f"task-{re.sub(r'[^A-Za-z0-9_.-]+', '_', key[1])}", own_session)
+
+    def _start_session(self):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        return {'profiles': [], 'skipped': [], 'started_tracing': started_tracing, 'started_at': time.perf_counter()}
+
+    def _dump(self, name, session):
+        snapshot, (current, peak) = tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()
+        if session['started_tracing']:
+            tracemalloc.stop() # Tracing slows every allocation down, so it only runs while profiling
+        try:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            base = os.path.join(PROFILES_DIR, f"{name}-{datetime.datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+            with open(f"{base}-stats.txt", 'w', encoding='utf-8') as f:
+                f.write(f"Profiled for {time.perf_counter() - session['started_at']:.3f}s\n")
+                if session['skipped']:
+                    f.write(f"Not profiled (ran alongside a profiled task): {', '.join(session['skipped'])}\n")
+                if session['profiles']:
+                    stats = pstats.Stats(*session['profiles'], stream=f)
+                    stats.dump_stats(f"{base}.prof")
+                    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_ENTRIES)
+            with open(f"{base}-memory.txt", 'w', encoding='utf-8') as f:
+                f.write(f"Traced memory: {current / 1024 / 1024:.1f} MB still held, {peak / 1024 / 1024:.1f} MB peak\n")
+                f.write(f"Top {PROFILE_TOP_ENTRIES} allocation sites still holding memory allocated while profiling:\n")
+                for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ENTRIES]:
+                    f.write(f"{stat}\n")
+            logging.info(f"Wrote profile to {base}-stats.txt" + (f", {base}.prof" if session['profiles'] else '') + f" and {base}-memory.txt")
+        except OSError as e:
+            logging.error(f"Could not write profile '{name}': {e}")
+
+PROFILER = Profiler()
 
 # --- Configuration & State Management ---
+DATE_FORMAT = "%Y-%m-%d"
+REQUIRED_TASK_FIELDS = {
+    'drive_tasks': ['title', 'folder_id', 'path'],
+    'emails': ['title', 'excel', 'date'],
+    'track_tasks': ['title', 'response_sheet_id', 'master_excel', 'result_path'],
+    'form_updater_tasks': ['title', 'tracker_title', 'form_link'],
+    'reminders': ['title', 'tracker_title', 'start_date', 'end_date', 'frequency'],
+}
+GOOGLE_ID_FIELDS = {'drive_tasks': 'folder_id', 'track_tasks': 'response_sheet_id', 'form_updater_tasks': 'form_link'}
+
+class Task(dict):
+    """One task from task_log.json: its raw fields plus values derived once when the config is loaded.
+
+    Being a dict, a Task can be used anywhere the raw task was. Derived attributes are None when
+    they do not apply to the task's kind.
+    """
+    def __init__(self, kind, fields):
+        super().__init__(fields)
+        self.kind = kind
+        self.title = fields.get('title')
+        missing = [field for field in REQUIRED_TASK_FIELDS.get(kind, ['title']) if not fields.get(field)]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        self.google_id = get_google_id_from_url(fields[GOOGLE_ID_FIELDS[kind]]) if kind in GOOGLE_ID_FIELDS else None
+        self.send_date = self._parse_date('date') if kind == 'emails' else None
+        self.start_date = self._parse_date('start_date') if kind == 'reminders' else None
+        self.end_date = self._parse_date('end_date') if kind == 'reminders' else None
+        self.tracker = None # Linked tracker Task of Form Updater and reminder tasks
+
+    def _parse_date(self, field):
+        try:
+            return datetime.datetime.strptime(self[field], DATE_FORMAT).date()
+        except ValueError:
+            raise ValueError(f"invalid {field} '{self[field]}'")
+
+class TaskConfig(dict):
+    """task_log.json compiled into Task objects, indexed by kind and title.
+
+    Tasks that fail validation are logged once here and left out, so handlers only see runnable tasks.
+    """
+    def __init__(self, raw=None):
+        raw = raw or {}
+        super().__init__(raw)
+        self.settings = raw.get('settings', {})
+        self.by_title = {}
+        for kind in TASK_KINDS:
+            tasks = []
+            for fields in raw.get(kind, []):
+                try:
+                    tasks.append(Task(kind, fields))
+                except ValueError as e:
+                    logging.warning(f"Skipping invalid task '{fields.get('title') or 'Untitled'}' in '{kind}': {e}")
+            self.by_title[kind] = {task.title: task for task in tasks}
+            if kind in raw:
+                self[kind] = tasks
+        for kind in ['form_updater_tasks', 'reminders']:
+            for task in self.get(kind, []):
+                task.tracker = self.by_title['track_tasks'].get(task['tracker_title'])
+                if task.tracker is None:
+                    logging.warning(f"Task '{task.title}' in '{kind}' links to unknown tracker task '{task['tracker_title']}'.")
+
+    def get_task(self, kind, title):
+        return self.by_title.get(kind, {}).get(title)
+
+_config_cache = (None, None) # (fingerprint of task_log.json, compiled config)
+
 def load_config():
-    """Loads the main configuration file (task_log.json)."""
-    if os.path.exists(CONFIG_FILE):
+    """Returns the compiled configuration, re-parsing task_log.json only when its size or mtime changed."""
+    global _config_cache
+    fingerprint = get_file_fingerprint(CONFIG_FILE)
+    if fingerprint is not None and fingerprint == _config_cache[0]:
+        return _config_cache[1]
+    raw = {}
+    if fingerprint is not None:
         try:
             with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
+                raw = json.load(f)
         except json.JSONDecodeError:
             logging.error(f"Error decoding JSON from {CONFIG_FILE}. The file might be corrupt.")
-            return {}
-    logging.warning(f"Configuration file {CONFIG_FILE} not found.")
-    return {}
+    else:
+        logging.warning(f"Configuration file {CONFIG_FILE} not found.")
+    _config_cache = (fingerprint, TaskConfig(raw))
+    return _config_cache[1]
 
-def load_state():
-    """Loads the state of previously run tasks."""
-    if os.path.exists(STATE_FILE):
+STATE_DB_FILE = 'headless_state.db' # SQLite state store; STATE_FILE is only read once to migrate it
+STATE_JOURNAL_MODE = 'DELETE' # Rollback journal, not WAL: WAL requires every process on one host, and copies on several machines may share the folder
+STATE_RETENTION_DAYS = 30 # Default age after which run keys and state of deleted tasks are compacted away; set 'state_retention_days' in settings
+STATE_TASK_SECTIONS = {'drive_tasks': 'drive_tasks', 'tracker_tasks': 'track_tasks', 'form_updater_tasks': 'form_updater_tasks', 'reminder_tasks': 'reminders', 'reminder_runs': 'reminders'} # State section -> config kind, for sections keyed by task title
+
+class StateStore:
+    """Task state kept in SQLite as one JSON row per (section, key), e.g. ('tracker_tasks', <title>).
+
+    The state is still handed to handlers as a nested dict, but saving only upserts the rows whose
+    value changed since they were loaded or last saved, in a single transaction. That makes it cheap
+    to save after every finished task, so a crash mid-cycle keeps all completed work.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._saved = {} # (section, key) -> JSON last read from or written to the database
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(f"PRAGMA journal_mode={STATE_JOURNAL_MODE}")
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS state (section TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (section, key))")
+            self._migrate_json()
+        return self._conn
+
+    def _migrate_json(self):
+        """One-time import of the old headless_state.json, which is then renamed out of the way."""
+        if not os.path.exists(STATE_FILE) or self._conn.execute("SELECT 1 FROM state LIMIT 1").fetchone():
+            return
         try:
             with open(STATE_FILE, 'r') as f:
-                return json.load(f)
+                legacy_state = json.load(f)
         except json.JSONDecodeError:
-            return {} # Return empty state if file is corrupt
-    return {}
+            logging.warning(f"{STATE_FILE} is corrupt and was not migrated.")
+            return
+        rows = [(section, str(key), json.dumps(value, sort_keys=True), time.time())
+                for section, entries in legacy_state.items() if isinstance(entries, dict) for key, value in entries.items()]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?)", rows)
+        os.replace(STATE_FILE, f"{STATE_FILE}.migrated")
+        logging.info(f"Migrated {len(rows)} state entries from {STATE_FILE} to {self.path}.")
+
+    def load(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT section, key, value FROM state").fetchall()
+            self._saved = {(section, key): value for section, key, value in rows}
+        state = {}
+        for (section, key), value in self._saved.items():
+            state.setdefault(section, {})[key] = json.loads(value)
+        return state
+
+    def save(self, state):
+        """Writes the entries of `state` that changed, and deletes the ones that were removed."""
+        with self._lock:
+            # Snapshotted under the lock so an entry refresh() is adding cannot look removed. The C JSON encoder
+            # copies each dict's items before walking them, so this is safe while handlers are still running
+            current = {(section, str(key)): json.dumps(value, sort_keys=True) for section, entries in list(state.items()) for key, value in list(entries.items())}
+            changed = [(section, key, value, time.time()) for (section, key), value in current.items() if self._saved.get((section, key)) != value]
+            removed = [key for key in self._saved if key not in current]
+            if not changed and not removed:
+                return
+            with self._connect():
+                self._conn.executemany("INSERT INTO state VALUES (?, ?, ?, ?) ON CONFLICT (section, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at", changed)
+                self._conn.executemany("DELETE FROM state WHERE section = ? AND key = ?", removed)
+            self._saved.update({(section, key): value for section, key, value, _ in changed})
+            for key in removed:
+                del self._saved[key]
+
+    def refresh(self, state):
+        """Pulls into `state` the entries that other instances wrote or deleted since they were loaded, e.g. before running a task just claimed."""
+        with self._lock:
+            rows = {(section, key): value for section, key, value in self._connect().execute("SELECT section, key, value FROM state")}
+            changed = {row_key: value for row_key, value in rows.items() if self._saved.get(row_key) != value}
+            removed = [row_key for row_key in self._saved if row_key not in rows]
+            self._saved.update(changed)
+            for row_key in removed:
+                del self._saved[row_key]
+            for (section, key), value in changed.items():
+                state.setdefault(section, {})[key] = json.loads(value)
+            for section, key in removed:
+                state.get(section, {}).pop(key, None)
+
+    def save_entries(self, state, entry_keys):
+        """Writes the given (section, key) entries of `state` that changed (deleting removed ones), without walking the rest."""
+        with self._lock:
+            values = {}
+            for section, key in entry_keys:
+                entries = state.get(section, {})
+                values[(section, str(key))] = json.dumps(entries[key], sort_keys=True) if key in entries else None
+            changed = {row_key: value for row_key, value in values.items() if self._saved.get(row_key) != value}
+            if not changed:
+                return
+            with self._connect():
+                self._conn.executemany("DELETE FROM state WHERE section = ? AND key = ?", [row_key for row_key, value in changed.items() if value is None])
+                self._conn.executemany("INSERT INTO state VALUES (?, ?, ?, ?) ON CONFLICT (section, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                                       [row_key + (value, time.time()) for row_key, value in changed.items() if value is not None])
+            for row_key, value in changed.items():
+                if value is None:
+                    self._saved.pop(row_key, None)
+                else:
+                    self._saved[row_key] = value
+
+    def compact(self, config, now):
+        """Drops state older than the retention window: email run keys, reminder send dates, and tasks no longer in the config."""
+        retention_days = int(config.get('settings', {}).get('state_retention_days', STATE_RETENTION_DAYS))
+        cutoff = now - datetime.timedelta(days=retention_days)
+        cutoff_date = cutoff.strftime(DATE_FORMAT)
+        current_titles = {section: set(config.by_title.get(kind, {})) for section, kind in STATE_TASK_SECTIONS.items()}
+        current_titles['form_structures'] = {task.google_id for task in config.get('form_updater_tasks', [])}
+        with self._lock:
+            conn = self._connect()
+            removed, rewritten = [], []
+            for section, key, value, updated_at in conn.execute("SELECT section, key, value, updated_at FROM state").fetchall():
+                run_date = re.search(r'_(\d{4}-\d{2}-\d{2})$', key) if section in ('email_tasks', 'email_progress') else None
+                if run_date and run_date.group(1) < cutoff_date:
+                    removed.append((section, key))
+                elif section in current_titles and key not in current_titles[section] and updated_at < cutoff.timestamp():
+                    removed.append((section, key))
+                elif section == 'timeouts' and updated_at < cutoff.timestamp():
+                    removed.append((section, key)) # Cleared when the task next finishes in time, so an old marker belongs to a task that never ran again
+                elif section == 'reminder_tasks':
+                    sent_dates = json.loads(value)
+                    kept = {email: sent_date for email, sent_date in sent_dates.items() if sent_date >= cutoff_date}
+                    if len(kept) != len(sent_dates):
+                        rewritten.append((json.dumps(kept, sort_keys=True), section, key))
+            if not removed and not rewritten:
+                return
+            with conn:
+                conn.executemany("DELETE FROM state WHERE section = ? AND key = ?", removed)
+                conn.executemany("UPDATE state SET value = ? WHERE section = ? AND key = ?", rewritten)
+            conn.execute("VACUUM")
+            for section, key in removed:
+                self._saved.pop((section, key), None)
+            for value, section, key in rewritten:
+                self._saved[(section, key)] = value
+        logging.info(f"Compacted state: removed {len(removed)} stale entries, pruned {len(rewritten)} reminder logs.")
+
+STATE_STORE = StateStore(STATE_DB_FILE)
+
+def load_state():
+    """Loads the state of previously run tasks."""
+    return STATE_STORE.load()
 
 def save_state(state):
-    """Saves the current state of tasks."""
-    with open(STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=4)
+    """Saves the entries of the task state that changed since the last load or save."""
+    with METRICS.timer('headless_state_save_duration_seconds'), log_span('file_write', path=STATE_DB_FILE):
+        STATE_STORE.save(state)
+
+def refresh_state(state):
+    """Updates the task state with the entries other instances changed since it was loaded."""
+    STATE_STORE.refresh(state)
+
+def save_state_entry(state, section, key):
+    """Commits one entry of the task state right away, e.g. a run's progress after each email sent."""
+    save_state_entries(state, [(section, key)])
+
+def save_state_entries(state, entry_keys):
+    """Commits the given (section, key) entries of the task state, e.g. the ones a finished task owns."""
+    with METRICS.timer('headless_state_save_duration_seconds'):
+        STATE_STORE.save_entries(state, entry_keys)
+
+def get_task_state_keys(kind, task):
+    """Returns the (section, key) state entries a run of `task` can write."""
+    title = task['title']
+    keys = [('timeouts', f"{kind}/{title}")]
+    if kind == 'emails':
+        keys += [('email_tasks', f"{title}_{task.get('date')}"), ('email_progress', f"{title}_{task.get('date')}")]
+    elif kind == 'reminders':
+        keys += [('reminder_tasks', title), ('reminder_runs', title)]
+    elif kind == 'form_updater_tasks':
+        keys += [('form_updater_tasks', title), ('form_structures', task.google_id)]
+    else:
+        keys.append(({'drive_tasks': 'drive_tasks', 'track_tasks': 'tracker_tasks'}[kind], title))
+    return keys
+
+LEASE_SECONDS = 120 # A claimed task stays locked this long after its owner's last heartbeat
+LEASE_HEARTBEAT_SECONDS = 30 # How often held leases are renewed
+
+class TaskLeases:
+    """Task-level locks shared by every headless instance that uses the same state database.
+
+    An instance runs a due task only after claiming its lease, so several instances (on one host,
+    or on hosts sharing the directory) split the work instead of repeating it. Held leases are
+    renewed by a heartbeat thread; if an instance dies, its leases expire and others take over.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._held = set()
+        self._heartbeat = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(f"PRAGMA journal_mode={STATE_JOURNAL_MODE}")
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS leases (kind TEXT NOT NULL, title TEXT NOT NULL, owner TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (kind, title))")
+        return self._conn
+
+    def claim(self, keys):
+        """Claims the free or expired leases among `keys` and returns the claimed keys."""
+        claimed = []
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            with conn:
+                for kind, title in keys:
+                    cursor = conn.execute("INSERT INTO leases VALUES (?, ?, ?, ?) ON CONFLICT (kind, title) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                                          "WHERE leases.expires_at < ? OR leases.owner = excluded.owner", (kind, title, self.owner, now + LEASE_SECONDS, now))
+                    if cursor.rowcount == 1:
+                        claimed.append((kind, title))
+            self._held.update(claimed)
+            if self._held and self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+                self._heartbeat.start()
+        return claimed
+
+    def release(self, keys):
+        with self._lock:
+            keys = [key for key in keys if key in self._held]
+            if not keys:
+                return
+            with self._connect():
+                self._conn.executemany("DELETE FROM leases WHERE kind = ? AND title = ? AND owner = ?", [(kind, title, self.owner) for kind, title in keys])
+            self._held.difference_update(keys)
+
+    def release_all(self):
+        self.release(list(self._held))
+
+    def _run(self):
+        while True:
+            time.sleep(LEASE_HEARTBEAT_SECONDS)
+            with self._lock:
+                if not self._held:
+                    continue
+                try:
+                    with self._connect():
+                        self._conn.execute("UPDATE leases SET expires_at = ? WHERE owner = ?", (time.time() + LEASE_SECONDS, self.owner))
+                except sqlite3.Error as e:
+                    logging.error(f"Could not renew task leases: {e}")
+
+TASK_LEASES = TaskLeases(STATE_DB_FILE)
+atexit.register(TASK_LEASES.release_all)
 
 # --- Core Logic Functions ---
 def get_google_id_from_url(url):
@@ -92,31 +842,271 @@ def get_google_id_from_url(url):
             return match.group(1)
     return url
 
-def get_creds():
-    creds = None
-    if not os.path.exists(CREDENTIALS_FILE):
-        logging.critical(f"Credentials file ('{CREDENTIALS_FILE}') not found. Headless script cannot run.")
-        return None
-    if os.path.exists(TOKEN_FILE):
+# --- Credentials ---
+TOKEN_REFRESH_MARGIN_SECONDS = 300 # Access tokens are refreshed this long before they expire
+TOKEN_RETRY_SECONDS = 60 # Wait before retrying a failed background refresh
+
+class CredentialManager:
+    """Keeps the Google credentials in memory and refreshes them before they expire.
+
+    Every handler shares the one Credentials object, which is refreshed in place, so clients
+    built from it pick up new tokens automatically. token.json is only re-read when its
+    size or mtime changes (e.g. after re-authenticating in the GUI) and only rewritten when
+    a refresh actually changed it.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._creds = None
+        self._token_fingerprint = None
+        self._saved_json = None
+        self._wakeup = threading.Event()
+        self._refresher = None
+
+    def get(self):
+        """Returns valid credentials, or None when they cannot be loaded or refreshed."""
+        with self._lock:
+            if not os.path.exists(CREDENTIALS_FILE):
+                logging.critical(f"Credentials file ('{CREDENTIALS_FILE}') not found. Headless script cannot run.")
+                return None
+            self._reload_if_changed()
+            if self._creds and self._seconds_to_expiry() <= TOKEN_REFRESH_MARGIN_SECONDS:
+                self._refresh()
+            if not self._creds or not self._creds.valid:
+                if not self._creds or not self._creds.refresh_token:
+                    logging.error("Credentials are not valid and cannot be refreshed. Please run the GUI to re-authenticate.")
+                return None
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run, name='token-refresher', daemon=True)
+                self._refresher.start()
+            self._wakeup.set()
+            return self._creds
+
+    def _reload_if_changed(self):
+        fingerprint = get_file_fingerprint(TOKEN_FILE)
+        if fingerprint == self._token_fingerprint:
+            return
+        self._token_fingerprint, self._creds = fingerprint, None
+        if fingerprint is None:
+            return
         try:
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+            self._creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+            self._saved_json = self._creds.to_json()
         except Exception as e:
             logging.warning(f"Failed to load token.json: {e}. Will try to re-authenticate.")
-            creds = None
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+
+    def _seconds_to_expiry(self):
+        if not self._creds.token:
+            return 0
+        if self._creds.expiry is None:
+            return float('inf')
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (self._creds.expiry - now).total_seconds()
+
+    def _refresh(self):
+        """Refreshes the token in place and saves it; returns False if the refresh failed."""
+        if not self._creds.refresh_token:
+            return False
+        try:
+            self._creds.refresh(Request())
+        except Exception as e:
+            logging.error(f"Could not refresh token. You may need to re-authenticate via the GUI. Error: {e}")
+            return False
+        logging.info("Google credentials refreshed successfully.")
+        token_json = self._creds.to_json()
+        if token_json != self._saved_json:
+            write_json_atomic(TOKEN_FILE, json.loads(token_json))
+            self._saved_json, self._token_fingerprint = token_json, get_file_fingerprint(TOKEN_FILE)
+        return True
+
+    def _run(self):
+        """Background loop: sleeps until shortly before expiry, then refreshes."""
+        while True:
+            with self._lock:
+                seconds = self._seconds_to_expiry() - TOKEN_REFRESH_MARGIN_SECONDS if self._creds else float('inf')
+                if seconds <= 0:
+                    seconds = 0 if self._refresh() else TOKEN_RETRY_SECONDS
+                    if seconds == 0:
+                        continue
+            self._wakeup.wait(min(seconds, MAX_IDLE_SECONDS))
+            self._wakeup.clear()
+
+CREDENTIAL_MANAGER = CredentialManager()
+
+def get_creds():
+    """Thread-safe accessor for the shared, proactively refreshed Google credentials."""
+    return CREDENTIAL_MANAGER.get()
+
+# --- Deadlines ---
+API_TIMEOUT_SECONDS = 60 # Socket timeout of each Google API request; set 'api_timeout_seconds' in settings
+SMTP_TIMEOUT_SECONDS = 30 # Socket timeout of SMTP connections; set 'smtp_timeout_seconds' in settings
+TASK_TIMEOUT_MINUTES = 30 # Default time budget of one task run; set 'task_timeout_minutes' in settings or 'timeout_minutes' on a task
+_api_timeout_seconds = API_TIMEOUT_SECONDS
+
+class TaskTimeout(Exception):
+    """Raised at a checkpoint once the running task has used up its time budget."""
+
+class Deadline:
+    """Time budget of one task run, shared by everything that runs on the task's behalf."""
+    def __init__(self, expires_at):
+        self.expires_at = expires_at # Wall-clock time.time(), so it can be handed to worker processes
+        self.exceeded = False # Set once work was cut short because the budget ran out
+
+    def remaining(self):
+        return self.expires_at - time.time()
+
+# Deadline of the task running in the current context, or None
+_task_deadline = contextvars.ContextVar('task_deadline', default=None)
+
+def get_remaining_time():
+    """Returns the seconds left before the current task's deadline, or None if it has none."""
+    deadline = _task_deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+def check_deadline():
+    """Checkpoint for long-running handlers: raises TaskTimeout once the current task's deadline has passed.
+
+    Handlers call it between units of work they can resume from, so a timed-out task leaves
+    consistent state behind and picks up where it stopped on its next run.
+    """
+    deadline = _task_deadline.get()
+    if deadline is not None and deadline.remaining() <= 0:
+        deadline.exceeded = True
+        raise TaskTimeout(f"time budget exceeded by {-deadline.remaining():.0f}s")
+
+# --- Google API Services ---
+_service_local = threading.local()
+
+def get_service(api, version, creds):
+    """Returns this thread's cached client for a Google API, authorized with `creds`.
+
+    Clients are built once per thread from the static discovery documents bundled with
+    google-api-python-client, and all of a thread's clients share one AuthorizedHttp so its
+    keep-alive connections to Google are reused. httplib2 and the clients are not thread-safe,
+    which is why nothing here is shared between threads.
+    """
+    http = getattr(_service_local, 'http', None)
+    if http is None:
+        http = _service_local.http = AuthorizedHttp(creds, http=build_http())
+        _service_local.services = {}
+    elif http.credentials is not creds:
+        http.credentials = creds
+    http.http.timeout = _api_timeout_seconds # Applies to connections opened from now on
+    service = _service_local.services.get((api, version))
+    if service is None:
+        service = _service_local.services[(api, version)] = build(api, version, http=http, cache_discovery=False, static_discovery=True)
+    return service
+
+_thread_pools = {} # name -> (worker count, long-lived ThreadPoolExecutor)
+_thread_pools_lock = threading.Lock()
+
+def get_thread_pool(name, workers):
+    """Returns a long-lived thread pool, recreating it when the worker count changes.
+
+    Keeping the threads across cycles keeps their Google API clients and connections warm.
+    """
+    with _thread_pools_lock:
+        pool_workers, pool = _thread_pools.get(name, (0, None))
+        if pool is None or pool_workers != workers:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            _thread_pools[name] = (workers, pool)
+        return pool
+
+# --- Google API Requests ---
+API_RETRY_ATTEMPTS = 6 # Total attempts for a call that keeps failing with a transient error
+API_BACKOFF_BASE_SECONDS = 1.0 # Backoff before the first retry; doubles per attempt, with full jitter
+API_BACKOFF_MAX_SECONDS = 64.0
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'} # 403 reasons that mean "slow down", not "forbidden"
+API_RATE_LIMITS = {'drive': (10, 20), 'sheets': (1, 10), 'forms': (2, 10)} # Per-user quotas as (requests per second, burst); override with 'api_rate_limits' in settings
+
+class TokenBucket:
+    """Thread-safe token bucket: `acquire()` blocks until a request may be sent and returns how long it waited."""
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = float(rate), float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now, even if that goes negative, so waiting callers queue up in order
+            self._tokens -= 1
+            wait_seconds = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait_seconds:
+            time.sleep(wait_seconds)
+        return wait_seconds
+
+_api_buckets = {api: TokenBucket(rate, burst) for api, (rate, burst) in API_RATE_LIMITS.items()}
+API_COUNTERS = {} # api -> {'calls', 'retries', 'failures', 'throttle_wait_seconds'}
+_api_counters_lock = threading.Lock()
+
+def count_api_event(api, counter, amount=1):
+    with _api_counters_lock:
+        counters = API_COUNTERS.setdefault(api, {'calls': 0, 'retries': 0, 'failures': 0, 'throttle_wait_seconds': 0.0})
+        counters[counter] += amount
+
+def get_retry_delay(error, attempt):
+    """Returns the delay before retrying `error`, or None if it is not transient."""
+    if isinstance(error, errors.HttpError):
+        status = error.resp.status
+        if status == 403:
             try:
-                creds.refresh(Request())
-                logging.info("Google credentials refreshed successfully.")
-            except Exception as e:
-                logging.error(f"Could not refresh token. You may need to re-authenticate via the GUI. Error: {e}")
+                reasons = {detail.get('reason') for detail in json.loads(error.content)['error']['errors']}
+            except (ValueError, KeyError, TypeError):
+                reasons = set()
+            if not reasons & RATE_LIMIT_REASONS:
                 return None
-        else:
-            logging.error("Credentials are not valid and cannot be refreshed. Please run the GUI to re-authenticate.")
+        elif status not in RETRYABLE_STATUS_CODES:
             return None
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-    return creds
+        retry_after = error.resp.get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after)
+                    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+    elif not isinstance(error, (ConnectionError, TimeoutError, httplib2.HttpLib2Error)):
+        return None
+    return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def call_google_api(api, call):
+    """Runs `call` (e.g. `request.execute` or `downloader.next_chunk`) under `api`'s rate limit.
+
+    Rate-limit and server errors, and dropped connections, are retried with exponential backoff and
+    jitter, honouring Retry-After; other errors, or the last failure, are raised to the caller.
+    """
+    bucket = _api_buckets.get(api)
+    for attempt in range(API_RETRY_ATTEMPTS):
+        check_deadline()
+        if bucket is not None:
+            waited = bucket.acquire()
+            if waited:
+                count_api_event(api, 'throttle_wait_seconds', waited)
+        count_api_event(api, 'calls')
+        try:
+            with log_span('api_call', api=api, attempt=attempt + 1):
+                return call()
+        except Exception as e:
+            delay = get_retry_delay(e, attempt)
+            deadline = _task_deadline.get()
+            if delay is not None and deadline is not None and delay >= deadline.remaining():
+                deadline.exceeded = True # Not worth waiting for a retry the task has no time left for
+                delay = None
+            if delay is None or attempt == API_RETRY_ATTEMPTS - 1:
+                count_api_event(api, 'failures')
+                raise
+            count_api_event(api, 'retries')
+            logging.warning(f"Transient {api} API error ({e}). Retrying in {delay:.1f}s (attempt {attempt + 2}/{API_RETRY_ATTEMPTS}).")
+            time.sleep(delay)
 
 def send_email(recipient, subject, body, config, cc_recipient=None):
     smtp_details = config.get('settings', {})
@@ -139,29 +1129,393 @@ def send_email(recipient, subject, body, config, cc_recipient=None):
                 msg['Cc'] = ', '.join(cc_list)
                 all_recipients.extend(cc_list)
 
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
+        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=float(smtp_details.get('smtp_timeout_seconds', SMTP_TIMEOUT_SECONDS))) as server:
             server.login(from_email, password)
             server.sendmail(from_email, all_recipients, msg.as_string())
         logging.info(f"Sent email to {recipient} (CC: {cc_recipient or 'None'}) with subject: {subject}")
+        METRICS.inc('headless_emails_total', outcome='sent')
+        add_span_counts(emails_sent=1)
         return True
     except Exception as e:
         logging.error(f"Failed to send email to {recipient}: {e}")
+        METRICS.inc('headless_emails_total', outcome='failed')
+        add_span_counts(emails_failed=1)
         return False
 
+def get_file_fingerprint(filepath):
+    """Returns a cheap (size, mtime_ns) fingerprint of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+_file_hash_cache = {} # abspath -> ((size, mtime_ns), sha256), so unchanged files are hashed once per process
+_file_hash_lock = threading.Lock()
+
 def get_file_hash(filepath):
-    if not os.path.exists(filepath):
+    fingerprint = get_file_fingerprint(filepath)
+    if fingerprint is None:
         return None
+    abs_path = os.path.abspath(filepath)
+    with _file_hash_lock:
+        cached = _file_hash_cache.get(abs_path)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
     sha256_hash = hashlib.sha256()
     with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        for byte_block in iter(lambda: f.read(65536), b""):
             sha256_hash.update(byte_block)
+    with _file_hash_lock:
+        _file_hash_cache[abs_path] = (fingerprint, sha256_hash.hexdigest())
     return sha256_hash.hexdigest()
 
+# --- Excel Loading ---
+# pandas' openpyxl engine already opens workbooks in read-only mode; calamine is preferred when installed
+EXCEL_ENGINE = 'calamine' if HAS_CALAMINE else 'openpyxl'
+CATEGORY_COLUMNS = ['Location', 'SPOC'] # Low-cardinality columns stored as categoricals to save memory
+
+def load_excel(filepath, columns=None):
+    """Parses the first sheet of a workbook, keeping only `columns` (all columns if None).
+
+    Requested columns that are missing from the sheet are silently left out, so callers keep
+    checking `df.columns` as before.
+    """
+    usecols = (lambda name: name in columns) if columns else None
+    df = pd.read_excel(filepath, usecols=usecols, engine=EXCEL_ENGINE)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+# --- Workbook Cache ---
+WORKBOOK_CACHE_MB = 256 # Default memory budget for parsed workbooks kept between handlers and cycles
+SIDECAR_DIR = 'excel_cache' # Columnar (Arrow) copies of parsed workbooks, reused until the source changes
+
+def get_sidecar_paths(filepath, columns):
+    """Returns the (data, metadata) sidecar paths for a workbook read with the given column projection."""
+    name = hashlib.sha1(json.dumps([os.path.abspath(filepath), columns]).encode('utf-8')).hexdigest()
+    return os.path.join(SIDECAR_DIR, name + '.arrow'), os.path.join(SIDECAR_DIR, name + '.json')
+
+def read_sidecar(filepath, columns, fingerprint):
+    """Loads a workbook from its columnar sidecar if it still matches the source file, else returns None."""
+    if feather is None:
+        return None
+    data_path, meta_path = get_sidecar_paths(filepath, columns)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if [meta.get('size'), meta.get('mtime_ns')] != list(fingerprint):
+        if meta.get('size') != fingerprint[0] or meta.get('sha256') != get_file_hash(filepath):
+            return None
+        meta['mtime_ns'] = fingerprint[1]
+        write_json_atomic(meta_path, meta)
+    try:
+        # Uncompressed Arrow IPC files are memory-mapped instead of copied into the process
+        return feather.read_table(data_path, memory_map=True).to_pandas()
+    except Exception as e:
+        logging.warning(f"Could not read sidecar for '{filepath}': {e}")
+        return None
+
+def write_sidecar(filepath, columns, fingerprint, df):
+    """Writes a columnar copy of a freshly parsed workbook next to its fingerprint."""
+    if feather is None:
+        return
+    data_path, meta_path = get_sidecar_paths(filepath, columns)
+    temp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(SIDECAR_DIR, exist_ok=True)
+        feather.write_feather(df, temp_path, compression='uncompressed')
+        os.replace(temp_path, data_path)
+        write_json_atomic(meta_path, {'source': os.path.abspath(filepath), 'size': fingerprint[0], 'mtime_ns': fingerprint[1], 'sha256': get_file_hash(filepath)})
+    except Exception as e:
+        # Mixed-type object columns cannot always be converted to Arrow; the workbook is simply parsed next time
+        logging.warning(f"Could not write sidecar for '{filepath}': {e}")
+        if os.path.exists(temp_path): os.remove(temp_path)
+
+def write_json_atomic(path, data):
+    """Writes JSON through a temporary file so readers never see a half-written file."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+class WorkbookCache:
+    """Process-wide LRU cache of parsed Excel workbooks, bounded by their in-memory size.
+
+    Entries are keyed by absolute path and column projection, and validated against the file's size and mtime. When only the
+    mtime changed (e.g. a sync client touched the file), the content hash decides whether to re-parse.
+    Misses are served from the columnar sidecar when one matches, and only parse the .xlsx otherwise.
+    """
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.hits = self.misses = self.sidecar_hits = 0
+        self._entries = OrderedDict() # (abspath, columns) -> (fingerprint, content_hash, df, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def take_counts(self):
+        """Returns (hits, sidecar_hits, misses) and resets them."""
+        with self._lock:
+            counts = (self.hits, self.sidecar_hits, self.misses)
+            self.hits = self.sidecar_hits = self.misses = 0
+        return counts
+
+    def add_counts(self, hits, sidecar_hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.sidecar_hits += sidecar_hits
+            self.misses += misses
+
+    def read_excel(self, filepath, columns=None):
+        columns = sorted(columns) if columns else None
+        key = (os.path.abspath(filepath), tuple(columns or ()))
+        fingerprint = get_file_fingerprint(filepath)
+        if fingerprint is None:
+            raise FileNotFoundError(2, "No such file or directory", filepath)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and (entry[0] == fingerprint or (entry[0][0] == fingerprint[0] and entry[1] == get_file_hash(filepath))):
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key] = (fingerprint,) + entry[1:]
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry[2].copy(deep=False)
+
+        # Each lookup counts once: as a hit, a sidecar hit, or a miss that parses the .xlsx
+        df = read_sidecar(filepath, columns, fingerprint)
+        parsed = df is None
+        if parsed:
+            df = load_excel(filepath, columns)
+            write_sidecar(filepath, columns, fingerprint, df)
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if parsed:
+                self.misses += 1
+            else:
+                self.sidecar_hits += 1
+            self._discard(key)
+            if nbytes <= self.budget_bytes:
+                self._entries[key] = (fingerprint, get_file_hash(filepath), df, nbytes)
+                self._total_bytes += nbytes
+                while self._total_bytes > self.budget_bytes:
+                    self._discard(next(iter(self._entries)))
+        return df.copy(deep=False)
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            while self._entries and self._total_bytes > self.budget_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[3]
+
+WORKBOOK_CACHE = WorkbookCache(WORKBOOK_CACHE_MB * 1024 * 1024)
+
+def read_excel_cached(filepath, columns=None):
+    """Reads an Excel file through the shared workbook cache. Treat the returned frame as read-only."""
+    return WORKBOOK_CACHE.read_excel(filepath, columns)
+
+# --- Google Sheets Helpers ---
+RESPONSE_COLUMNS = ['Email', 'Location', 'Upload the Applicable Documents', 'Timestamp']
+SHEETS_PAGE_ROWS = 5000 # Rows fetched per batchGet call when streaming a response sheet
+
+def quote_sheet_name(sheet_name):
+    """Quotes a sheet title for use in an A1 range."""
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+def get_response_sheet_properties(sheets_service, sheet_id):
+    """Returns (title, row_count) of the 'Form Responses' sheet, falling back to the first sheet."""
+    metadata = call_google_api('sheets', sheets_service.spreadsheets().get(spreadsheetId=sheet_id, fields='sheets.properties(title,gridProperties.rowCount)').execute)
+    sheets = metadata.get('sheets', [])
+    properties = next((s['properties'] for s in sheets if s['properties']['title'].startswith("Form Responses")), sheets[0]['properties'])
+    return properties['title'], properties.get('gridProperties', {}).get('rowCount', 0)
+
+def fetch_response_header(sheets_service, sheet_id, sheet_name):
+    """Fetches only the header row of a response sheet."""
+    values = call_google_api('sheets', sheets_service.spreadsheets().values().get(spreadsheetId=sheet_id, range=f"{quote_sheet_name(sheet_name)}!1:1").execute).get('values', [])
+    return values[0] if values else []
+
+def iter_response_blocks(sheets_service, sheet_id, sheet_name, column_indexes, row_count, page_size=SHEETS_PAGE_ROWS):
+    """Yields the data rows of a response sheet in blocks of at most `page_size` rows.
+
+    Only the columns at `column_indexes` are requested, one batchGet range per column, so the full
+    sheet is never held in memory. Each row is a tuple ordered like `column_indexes`, padded with None.
+    """
+    letters = [get_column_letter(index + 1) for index in column_indexes]
+    for start_row in range(2, row_count + 1, page_size):
+        end_row = min(start_row + page_size - 1, row_count)
+        ranges = [f"{quote_sheet_name(sheet_name)}!{letter}{start_row}:{letter}{end_row}" for letter in letters]
+        result = call_google_api('sheets', sheets_service.spreadsheets().values().batchGet(spreadsheetId=sheet_id, ranges=ranges, majorDimension='COLUMNS').execute)
+        columns = [(value_range.get('values') or [[]])[0] for value_range in result.get('valueRanges', [])]
+        block_length = max((len(column) for column in columns), default=0)
+        if block_length:
+            yield [tuple(column[i] if i < len(column) else None for column in columns) for i in range(block_length)]
+
+def load_response_map(sheets_service, sheet_id):
+    """Streams a response sheet into {(email, location): (doc_links, latest_timestamp)}.
+
+    Returns the map together with a SHA-256 of the fetched columns, which is used for change detection.
+    """
+    sheet_name, row_count = get_response_sheet_properties(sheets_service, sheet_id)
+    header = fetch_response_header(sheets_service, sheet_id, sheet_name)
+    if not header:
+        raise ValueError(f"No data in response sheet '{sheet_name}'.")
+    missing_cols = [col for col in RESPONSE_COLUMNS if col != 'Timestamp' and col not in header]
+    if missing_cols:
+        raise ValueError(f"Response sheet '{sheet_name}' is missing columns: {missing_cols}")
+
+    ts_col = 'Timestamp' if 'Timestamp' in header else header[0]
+    column_indexes = [header.index(col) for col in ['Email', 'Location', 'Upload the Applicable Documents', ts_col]]
+    response_hash = hashlib.sha256(json.dumps(header).encode('utf-8'))
+    response_map = {}
+    for block in iter_response_blocks(sheets_service, sheet_id, sheet_name, column_indexes, row_count):
+        for email_addr, location, doc, timestamp in block:
+            response_hash.update(json.dumps([email_addr, location, doc, timestamp]).encode('utf-8'))
+            key = (str(email_addr).strip().lower(), str(location).strip().lower())
+            docs, last_timestamp = response_map.get(key, ([], None))
+            # Splits by comma OR newline to handle all multi-upload cases.
+            if doc is not None and str(doc).strip():
+                docs.extend(link.strip() for link in re.split(r'[,\n]', str(doc)) if link.strip())
+            if timestamp is not None and (last_timestamp is None or str(timestamp) > str(last_timestamp)):
+                last_timestamp = timestamp
+            response_map[key] = (docs, last_timestamp)
+    return response_map, response_hash.hexdigest()
+
+# --- Tracker Output ---
+TRACKER_WORKERS = 1 # Default number of tracker processes; set 'tracker_workers' in settings to generate trackers in parallel
+TRACKER_COLUMNS = ['S.No.', 'Location', 'SPOC', 'Email ID', 'Document Uploaded', 'Uploaded', 'Uploaded When']
+TRACKER_GROUP_COLUMNS = ['S.No.', 'Location', 'SPOC', 'Email ID', 'Uploaded', 'Uploaded When'] # Merged per person in the styled workbook
+TRACKER_OUTPUT_FORMATS = ['xlsx', 'csv', 'parquet', 'json']
+
+def get_tracker_output_formats(task):
+    """Returns the task's valid 'output_formats', defaulting to the styled workbook only."""
+    formats = []
+    for fmt in task.get('output_formats') or ['xlsx']:
+        fmt = str(fmt).strip().lower().lstrip('.')
+        if fmt not in TRACKER_OUTPUT_FORMATS:
+            logging.warning(f"Ignoring unknown tracker output format '{fmt}' for '{task.get('title')}'.")
+        elif fmt not in formats:
+            formats.append(fmt)
+    return formats or ['xlsx']
+
+def get_tracker_output_path(result_path, fmt):
+    """Returns the file written for `fmt`: the result path itself for xlsx, a sibling file otherwise."""
+    return result_path if fmt == 'xlsx' else os.path.splitext(result_path)[0] + '.' + fmt
+
+def build_tracker_frame(df_master, response_map):
+    """Builds the tracker table: one row per uploaded document, with person columns only on a group's first row."""
+    final_rows, s_no = [], 1
+    for _, row in df_master.iterrows():
+        key = (str(row['Email ID']).strip().lower(), str(row['Location']).strip().lower())
+        docs, timestamp = response_map.get(key, ([], ''))
+
+        if docs:
+            first_row_in_group = True
+            for doc_link in docs:
+                final_rows.append({
+                    'S.No.': s_no if first_row_in_group else None,
+                    'Location': row['Location'] if first_row_in_group else None,
+                    'SPOC': row['SPOC'] if first_row_in_group else None,
+                    'Email ID': row['Email ID'] if first_row_in_group else None,
+                    'Document Uploaded': doc_link,
+                    'Uploaded': 'Yes' if first_row_in_group else None,
+                    'Uploaded When': timestamp if first_row_in_group else None
+                })
+                first_row_in_group = False
+            s_no += 1
+        else:
+            final_rows.append({
+                'S.No.': s_no, 'Location': row['Location'], 'SPOC': row['SPOC'], 
+                'Email ID': row['Email ID'], 'Document Uploaded': '', 'Uploaded': 'No', 'Uploaded When': ''
+            })
+            s_no += 1
+
+    return pd.DataFrame(final_rows, columns=TRACKER_COLUMNS)
+
+def write_styled_tracker(tracker_df, result_path):
+    """Writes the formatted, colour-coded and merged tracker workbook."""
+    tracker_df.to_excel(result_path, index=False)
+
+    # Apply advanced formatting with openpyxl
+    wb = load_workbook(result_path)
+    ws = wb.active
+
+    for idx, width in enumerate([6, 20, 25, 30, 50, 12, 25], start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+    center_align = Alignment(vertical="center", horizontal="center", wrap_text=True)
+
+    for row in ws.iter_rows(min_row=1, max_row=ws.max_row):
+        for cell in row:
+            if cell.column != 5: # Don't center the document links column
+                cell.alignment = center_align
+
+    cols_to_merge = [1, 2, 3, 4, 6, 7]
+    current_row_idx = 2
+    while current_row_idx <= ws.max_row:
+        if ws.cell(row=current_row_idx, column=1).value is not None:
+            merge_count = 1
+            scan_row_idx = current_row_idx + 1
+            while scan_row_idx <= ws.max_row and ws.cell(row=scan_row_idx, column=1).value is None:
+                merge_count += 1
+                scan_row_idx += 1
+
+            uploaded_cell = ws.cell(row=current_row_idx, column=6)
+            if uploaded_cell.value == "Yes": uploaded_cell.fill = green_fill
+            elif uploaded_cell.value == "No": uploaded_cell.fill = red_fill
+
+            if merge_count > 1:
+                end_row_idx = current_row_idx + merge_count - 1
+                for col_idx in cols_to_merge:
+                    ws.merge_cells(start_row=current_row_idx, start_column=col_idx, end_row=end_row_idx, end_column=col_idx)
+
+            current_row_idx += merge_count
+        else:
+            current_row_idx += 1
+
+    wb.save(result_path)
+
+def write_flat_tracker(tracker_df, output_path, fmt):
+    """Writes an unmerged tracker where every row repeats its person's columns, for scripts and dashboards."""
+    flat_df = tracker_df.copy()
+    flat_df['S.No.'] = flat_df['S.No.'].ffill().astype(int)
+    flat_df[TRACKER_GROUP_COLUMNS[1:]] = flat_df.groupby('S.No.')[TRACKER_GROUP_COLUMNS[1:]].transform('first')
+    if fmt == 'csv':
+        flat_df.to_csv(output_path, index=False)
+    elif fmt == 'parquet':
+        flat_df.astype({col: 'string' for col in TRACKER_COLUMNS[1:]}).to_parquet(output_path, index=False)
+    elif fmt == 'json':
+        flat_df.to_json(output_path, orient='records')
+
+def read_tracker_results(tracker_task, columns):
+    """Reads a generated tracker, preferring a flat output over re-parsing the styled workbook."""
+    result_path = tracker_task.get('result_path')
+    output_formats = get_tracker_output_formats(tracker_task)
+    for fmt in ['parquet', 'csv', 'json']:
+        output_path = get_tracker_output_path(result_path, fmt)
+        if fmt in output_formats and os.path.exists(output_path):
+            if fmt == 'parquet':
+                return pd.read_parquet(output_path, columns=columns)
+            if fmt == 'csv':
+                return pd.read_csv(output_path, usecols=columns)
+            return pd.read_json(output_path, orient='records')[columns]
+    return read_excel_cached(result_path, columns)
+
 # --- Task Handlers ---
 
 def handle_drive_tasks(creds, tasks, state):
     logging.info("Checking for Drive tasks...")
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = get_service('drive', 'v3', creds)
     
     for task in tasks:
         task_title = task.get('title')
@@ -172,18 +1526,22 @@ def handle_drive_tasks(creds, tasks, state):
             logging.warning(f"Skipping invalid Drive task: {task_title or 'Untitled'}")
             continue
 
-        folder_id = get_google_id_from_url(folder_url_or_id)
+        folder_id = task.google_id
         logging.info(f"Processing Drive task: '{task_title}' (Folder ID: {folder_id})")
 
         try:
             # Get metadata for all files in the folder
-            results = drive_service.files().list(q=f"'{folder_id}' in parents and trashed=false", fields="files(id, name, mimeType, modifiedTime, md5Checksum)").execute()
+            results = call_google_api('drive', drive_service.files().list(q=f"'{folder_id}' in parents and trashed=false", fields="files(id, name, mimeType, modifiedTime, md5Checksum)").execute)
             remote_files = results.get('files', [])
             if not os.path.exists(local_path): os.makedirs(local_path)
             
             task_state = state.setdefault('drive_tasks', {}).setdefault(task_title, {})
 
             for item in remote_files:
+                if SHUTDOWN_EVENT.is_set():
+                    logging.info(f"Shutting down. Drive task '{task_title}' will resume from the next file.")
+                    break
+                check_deadline()
                 file_name, file_id, mime_type, remote_mod_time, remote_md5 = item.get('name'), item.get('id'), item.get('mimeType'), item.get('modifiedTime'), item.get('md5Checksum')
                 
                 # Logic for handling Google Workspace file exports
@@ -224,12 +1582,17 @@ def handle_drive_tasks(creds, tasks, state):
                     fh = io.BytesIO()
                     downloader = MediaIoBaseDownload(fh, request)
                     done = False
-                    while not done: status, done = downloader.next_chunk()
-                    with open(local_file_path, 'wb') as f: f.write(fh.getbuffer())
+                    while not done: status, done = call_google_api('drive', downloader.next_chunk)
+                    size = fh.getbuffer().nbytes
+                    with log_span('file_write', path=local_file_path, bytes=size):
+                        with open(local_file_path, 'wb') as f: f.write(fh.getbuffer())
+                    METRICS.inc('headless_drive_downloaded_bytes_total', size)
+                    add_span_counts(files_downloaded=1, bytes_downloaded=size)
                     
                     # Update state with the correct metadata
                     task_state[file_name] = {'modifiedTime': remote_mod_time, 'md5': remote_md5}
 
+        except TaskTimeout: raise # Reported once by the task graph
         except errors.HttpError as e: logging.error(f"API Error for Drive task '{task_title}': {e}")
         except Exception as e: logging.error(f"Failed to process Drive task '{task_title}': {e}")
 
@@ -246,205 +1609,363 @@ def handle_email_tasks(config, tasks, state):
             logging.info(f"Email task '{task_title}' for {today_str} has already been executed. Skipping.")
             continue
             
+        # Rows already handled by an interrupted run of this task today are not emailed again
+        email_progress = state.setdefault('email_progress', {})
         logging.info(f"Executing scheduled email task: '{task_title}'")
         try:
-            df = pd.read_excel(task["excel"])
-            for _, row in df.iterrows():
+            df = read_excel_cached(task["excel"], ['Email', 'Email ID'])
+            for row_number, (_, row) in enumerate(df.iterrows()):
+                if row_number < email_progress.get(task_run_key, 0): continue
+                if SHUTDOWN_EVENT.is_set():
+                    logging.info(f"Shutting down. Email task '{task_title}' will resume from row {row_number + 1} on restart.")
+                    break
+                check_deadline()
                 recipient = next((str(row[col]).strip() for col in ['Email', 'Email ID'] if col in row and pd.notna(row[col])), None)
-                if not recipient: continue
-                send_email(recipient, task['subject'], task['msg'], config, cc_recipient=task.get('cc'))
-                time.sleep(1)
-
-            state.setdefault('email_tasks', {})[task_run_key] = True
-            logging.info(f"Finished email task '{task_title}'.")
+                if recipient:
+                    send_email(recipient, task['subject'], task['msg'], config, cc_recipient=task.get('cc'))
+                    time.sleep(1)
+                email_progress[task_run_key] = row_number + 1
+                # Committed per row, so a crash part-way through never re-sends to the rows already done
+                save_state_entry(state, 'email_progress', task_run_key)
+            else:
+                state.setdefault('email_tasks', {})[task_run_key] = True
+                email_progress.pop(task_run_key, None)
+                logging.info(f"Finished email task '{task_title}'.")
+        except TaskTimeout: raise # Reported once by the task graph
         except Exception as e: logging.error(f"Failed to execute email task '{task_title}': {e}")
 
-def handle_tracker_tasks(creds, tasks, state):
+def generate_tracker(sheets_service, task, task_state):
+    """Regenerates one tracker if its sources changed and returns the state delta to merge for it.
+
+    `task_state` is only read, so this can run in a worker process on a copy of the state.
+    """
+    task_title, master_excel, result_path = task['title'], task['master_excel'], task['result_path']
+    sheet_id = task.google_id
+    output_formats = get_tracker_output_formats(task)
+    output_paths = [get_tracker_output_path(result_path, fmt) for fmt in output_formats]
+    try:
+        # Get master file hash
+        master_hash = get_file_hash(master_excel)
+        
+        # Stream only the needed response columns and hash them as they arrive for reliable change detection.
+        # Only the fetch holds a Sheets slot; building and writing the tracker is local work
+        with service_slot('sheets'):
+            response_map, response_data_hash = load_response_map(sheets_service, sheet_id)
+
+        # RELIABLE CHECK: Compare hash of master file AND hash of response data content
+        if task_state.get('last_master_hash') == master_hash and task_state.get('last_response_data_hash') == response_data_hash and all(os.path.exists(path) for path in output_paths):
+            logging.info(f"Tracker source for '{task_title}' has not changed. Skipping generation.")
+            return {}
+
+        logging.info(f"Change detected for '{task_title}'. Regenerating tracker...")
+        df_master = read_excel_cached(master_excel, ['Email ID', 'Location', 'SPOC'])
+        
+        tracker_df = build_tracker_frame(df_master, response_map)
+        # Flat formats are cheap, so they are written before the styled workbook. Each output is written
+        # to a temporary file first so a crash never leaves a half-written tracker behind.
+        for fmt in sorted(output_formats, key=lambda fmt: fmt == 'xlsx'):
+            check_deadline()
+            output_path = get_tracker_output_path(result_path, fmt)
+            root, ext = os.path.splitext(output_path)
+            temp_path = f"{root}.{os.getpid()}.tmp{ext}"
+            with log_span('file_write', path=output_path, format=fmt, rows=len(tracker_df)) as span:
+                if fmt == 'xlsx':
+                    write_styled_tracker(tracker_df, temp_path)
+                else:
+                    write_flat_tracker(tracker_df, temp_path, fmt)
+                os.replace(temp_path, output_path)
+                span['bytes'] = os.path.getsize(output_path)
+        logging.info(f"Successfully generated tracker for '{task_title}' at {', '.join(output_paths)}")
+        
+        # Return the new, reliable hashes for the state file
+        return {
+            'last_master_hash': master_hash,
+            'last_response_data_hash': response_data_hash,
+            'last_generated': datetime.datetime.now().isoformat()
+        }
+
+    except TaskTimeout: raise # Reported once by the task graph
+    except errors.HttpError as e: logging.error(f"API Error processing Tracker task '{task_title}': {e}")
+    except Exception as e: logging.error(f"Failed to process Tracker task '{task_title}': {e}", exc_info=True)
+    return {}
+
+def run_tracker_in_worker(creds_info, task, task_state, expires_at=None, log_format='text'):
+    """Process-pool entry point: rebuilds credentials and a Sheets client, then generates one tracker.
+
+    Returns the tracker's state delta and the metrics the worker recorded, which the daemon merges into its own.
+    """
+    configure_log_format(log_format)
+    _task_deadline.set(Deadline(expires_at) if expires_at else None)
+    creds = Credentials.from_authorized_user_info(creds_info, SCOPES)
+    return generate_tracker(get_service('sheets', 'v4', creds), task, task_state), METRICS.drain()
+
+def init_tracker_worker(service_settings, workers, sheets_slots):
+    """Process-pool initializer: applies the daemon's API limits and makes the workers share one cap on concurrent Sheets fetches.
+
+    Each worker has its own rate limiters, so every per-API rate and burst is split across the workers
+    to keep their total within the configured quota.
+    """
+    rate_limits = dict(API_RATE_LIMITS, **service_settings.get('api_rate_limits', {}))
+    configure_service_limits(dict(service_settings, api_rate_limits={api: (float(rate) / workers, max(1.0, float(burst) / workers)) for api, (rate, burst) in rate_limits.items()}))
+    _service_semaphores['sheets'] = sheets_slots
+
+_tracker_pool = None
+_tracker_pool_options = None
+_tracker_pool_lock = threading.Lock() # Tracker graph nodes run concurrently and share the one pool
+
+def get_tracker_pool(workers):
+    """Returns the long-lived tracker process pool, recreating it when the worker count or the API limits change.
+
+    Keeping the pool across cycles keeps each worker's workbook cache warm.
+    """
+    global _tracker_pool, _tracker_pool_options
+    options = (workers, json.dumps(_service_settings, sort_keys=True))
+    with _tracker_pool_lock:
+        if _tracker_pool is None or _tracker_pool_options != options:
+            if _tracker_pool is not None:
+                _tracker_pool.shutdown(wait=False, cancel_futures=True)
+            # 'spawn' everywhere: forking a process that runs other threads is unsafe
+            context = multiprocessing.get_context('spawn')
+            sheets_slots = context.BoundedSemaphore(_service_limits.get('sheets', SERVICE_CONCURRENCY['sheets']))
+            _tracker_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_tracker_worker, initargs=(_service_settings, workers, sheets_slots))
+            _tracker_pool_options = options
+        return _tracker_pool
+
+def shutdown_tracker_pool(pool=None):
+    """Shuts the tracker pool down; with `pool`, only if that is still the current one (e.g. the one that broke)."""
+    global _tracker_pool
+    with _tracker_pool_lock:
+        if _tracker_pool is not None and pool in (None, _tracker_pool):
+            _tracker_pool.shutdown(wait=False, cancel_futures=True)
+            _tracker_pool = None
+
+def handle_tracker_tasks(creds, tasks, state, workers=TRACKER_WORKERS):
     logging.info("Checking for Tracker tasks...")
-    sheets_service = build('sheets', 'v4', credentials=creds)
+    valid_tasks = []
     for task in tasks:
         task_title, sheet_url_or_id, master_excel, result_path = task.get('title'), task.get('response_sheet_id'), task.get('master_excel'), task.get('result_path')
         if not all([task_title, sheet_url_or_id, master_excel, result_path]):
             logging.warning(f"Skipping invalid Tracker task: {task_title or 'Untitled'}")
             continue
-        
-        sheet_id = get_google_id_from_url(sheet_url_or_id)
+        valid_tasks.append(task)
+
+    tracker_states = state.setdefault('tracker_tasks', {})
+    if workers <= 1:
+        sheets_service = get_service('sheets', 'v4', creds)
+        for task in valid_tasks:
+            tracker_states.setdefault(task['title'], {}).update(generate_tracker(sheets_service, task, tracker_states.get(task['title'], {})))
+        return
+
+    # Each worker gets a copy of its task's state and returns a delta, which is merged here
+    creds_info = json.loads(creds.to_json())
+    pool = get_tracker_pool(workers)
+    deadline = _task_deadline.get()
+    futures = {}
+    for task in valid_tasks:
         try:
-            # Get master file hash
-            master_hash = get_file_hash(master_excel)
-            
-            # Get response sheet data and create a hash from its content for reliable change detection
-            spreadsheet_metadata = sheets_service.spreadsheets().get(spreadsheetId=sheet_id).execute()
-            sheet_name = next((s['properties']['title'] for s in spreadsheet_metadata.get('sheets', []) if s['properties']['title'].startswith("Form Responses")), spreadsheet_metadata['sheets'][0]['properties']['title'])
-            data = sheets_service.spreadsheets().values().get(spreadsheetId=sheet_id, range=sheet_name).execute().get('values', [])
-            
-            response_data_str = json.dumps(data)
-            response_data_hash = hashlib.sha256(response_data_str.encode('utf-8')).hexdigest()
+            futures[pool.submit(run_tracker_in_worker, creds_info, task, dict(tracker_states.get(task['title'], {})), deadline and deadline.expires_at, _log_format)] = task['title']
+        except (BrokenProcessPool, RuntimeError) as e:
+            # The pool broke, or another tracker node replaced it, after it was fetched; the task is tried again next cycle
+            logging.error(f"Could not start Tracker task '{task['title']}': {e}")
+            shutdown_tracker_pool(pool)
+    for future in as_completed(futures):
+        task_title = futures[future]
+        try:
+            delta, worker_metrics = future.result()
+            METRICS.merge(worker_metrics)
+            tracker_states.setdefault(task_title, {}).update(delta)
+        except BrokenProcessPool as e:
+            logging.error(f"Tracker worker process crashed while processing '{task_title}': {e}")
+            shutdown_tracker_pool(pool)
+        except TaskTimeout: pass # The deadline is marked exceeded below and reported once by the task graph
+        except Exception as e: logging.error(f"Failed to process Tracker task '{task_title}': {e}")
+    # Workers cannot report their deadline back; a budget that ran out while they worked means they were cut short
+    if deadline is not None and deadline.remaining() <= 0:
+        deadline.exceeded = True
 
-            task_state = state.setdefault('tracker_tasks', {}).setdefault(task_title, {})
-            
-            # RELIABLE CHECK: Compare hash of master file AND hash of response data content
-            if task_state.get('last_master_hash') == master_hash and task_state.get('last_response_data_hash') == response_data_hash:
-                logging.info(f"Tracker source for '{task_title}' has not changed. Skipping generation.")
-                continue
 
-            logging.info(f"Change detected for '{task_title}'. Regenerating tracker...")
-            
-            if not data or len(data) < 1: 
-                logging.error(f"No data in response sheet for '{task_title}'."); 
-                continue
-            
-            header = data[0]
-            padded_rows = [row + [None] * (len(header) - len(row)) for row in data[1:]]
-            df_response = pd.DataFrame(padded_rows, columns=header).loc[:,~pd.DataFrame(padded_rows, columns=header).columns.duplicated()]
-            df_master = pd.read_excel(master_excel)
-            
-            df_response['Email'] = df_response['Email'].astype(str).str.strip().str.lower()
-            df_response['Location'] = df_response['Location'].astype(str).str.strip().str.lower()
-            ts_col = 'Timestamp' if 'Timestamp' in df_response.columns else df_response.columns[0]
-            
-            # UPDATED: This lambda now splits by comma OR newline to handle all multi-upload cases.
-            agg_response = (df_response.groupby(['Email', 'Location']).agg(
-                docs=('Upload the Applicable Documents', lambda x: [link.strip() for doc in x if pd.notna(doc) and str(doc).strip() for link in re.split(r'[,\n]', str(doc)) if link.strip()]),
-                timestamp=(ts_col, 'max')
-            ).reset_index())
-            
-            response_map = {(row['Email'], row['Location']): (row['docs'], row['timestamp']) for _, row in agg_response.iterrows()}
-            
-            final_rows, s_no = [], 1
-            for _, row in df_master.iterrows():
-                key = (str(row['Email ID']).strip().lower(), str(row['Location']).strip().lower())
-                docs, timestamp = response_map.get(key, ([], ''))
-
-                if docs:
-                    first_row_in_group = True
-                    for doc_link in docs:
-                        final_rows.append({
-                            'S.No.': s_no if first_row_in_group else None,
-                            'Location': row['Location'] if first_row_in_group else None,
-                            'SPOC': row['SPOC'] if first_row_in_group else None,
-                            'Email ID': row['Email ID'] if first_row_in_group else None,
-                            'Document Uploaded': doc_link,
-                            'Uploaded': 'Yes' if first_row_in_group else None,
-                            'Uploaded When': timestamp if first_row_in_group else None
-                        })
-                        first_row_in_group = False
-                    s_no += 1
-                else:
-                    final_rows.append({
-                        'S.No.': s_no, 'Location': row['Location'], 'SPOC': row['SPOC'], 
-                        'Email ID': row['Email ID'], 'Document Uploaded': '', 'Uploaded': 'No', 'Uploaded When': ''
-                    })
-                    s_no += 1
-
-            tracker_df = pd.DataFrame(final_rows, columns=['S.No.', 'Location', 'SPOC', 'Email ID', 'Document Uploaded', 'Uploaded', 'Uploaded When'])
-            tracker_df.to_excel(result_path, index=False)
-
-            # Apply advanced formatting with openpyxl
-            wb = load_workbook(result_path)
-            ws = wb.active
-            
-            for idx, width in enumerate([6, 20, 25, 30, 50, 12, 25], start=1):
-                ws.column_dimensions[get_column_letter(idx)].width = width
-            
-            green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-            red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-            center_align = Alignment(vertical="center", horizontal="center", wrap_text=True)
-
-            for row in ws.iter_rows(min_row=1, max_row=ws.max_row):
-                for cell in row:
-                    if cell.column != 5: # Don't center the document links column
-                        cell.alignment = center_align
-            
-            cols_to_merge = [1, 2, 3, 4, 6, 7]
-            current_row_idx = 2
-            while current_row_idx <= ws.max_row:
-                if ws.cell(row=current_row_idx, column=1).value is not None:
-                    merge_count = 1
-                    scan_row_idx = current_row_idx + 1
-                    while scan_row_idx <= ws.max_row and ws.cell(row=scan_row_idx, column=1).value is None:
-                        merge_count += 1
-                        scan_row_idx += 1
-                    
-                    uploaded_cell = ws.cell(row=current_row_idx, column=6)
-                    if uploaded_cell.value == "Yes": uploaded_cell.fill = green_fill
-                    elif uploaded_cell.value == "No": uploaded_cell.fill = red_fill
-
-                    if merge_count > 1:
-                        end_row_idx = current_row_idx + merge_count - 1
-                        for col_idx in cols_to_merge:
-                            ws.merge_cells(start_row=current_row_idx, start_column=col_idx, end_row=end_row_idx, end_column=col_idx)
-                    
-                    current_row_idx += merge_count
-                else:
-                    current_row_idx += 1
-            
-            wb.save(result_path)
-            logging.info(f"Successfully generated tracker for '{task_title}' at {result_path}")
-            
-            # Save the new, reliable hashes to the state file
-            task_state['last_master_hash'] = master_hash
-            task_state['last_response_data_hash'] = response_data_hash
-            task_state['last_generated'] = datetime.datetime.now().isoformat()
+# --- Form Updater Helpers ---
+FORM_FIELD_MAPPINGS = {'Location': 'Location', 'Email': 'Email ID', 'SPOC Name': 'SPOC'} # Form question title -> Excel column
+FORMS_MAX_REQUEST_BYTES = 512 * 1024 # Upper bound for one batchUpdate body; bigger updates are spread over several calls
+FORM_UPDATER_WORKERS = 4 # Default number of forms updated at once per workbook; set 'form_updater_workers' in settings
+
+def get_dropdown_options(df, field_mappings):
+    """Returns {question title: [option values]} for every mapped column that has data."""
+    options = {}
+    for form_title, excel_column in field_mappings.items():
+        if excel_column not in df.columns: logging.warning(f"Column '{excel_column}' not in Excel. Skipping '{form_title}'."); continue
+        # Forms rejects duplicate options, so de-duplicate on the string value while keeping sheet order
+        options_list = list(dict.fromkeys(str(opt) for opt in df[excel_column].dropna().unique().tolist()))
+        if not options_list: logging.warning(f"No data in column '{excel_column}'. Skipping '{form_title}'."); continue
+        options[form_title] = options_list
+    return options
+
+def get_options_fingerprint(options):
+    return hashlib.sha256(json.dumps(options).encode('utf-8')).hexdigest()
+
+def get_current_options(item):
+    """Returns the option values of a dropdown question, or None if the item is not a dropdown."""
+    choice_question = item.get('questionItem', {}).get('question', {}).get('choiceQuestion', {})
+    if choice_question.get('type') != 'DROP_DOWN':
+        return None
+    return [option.get('value') for option in choice_question.get('options', [])]
 
-        except errors.HttpError as e: logging.error(f"API Error processing Tracker task '{task_title}': {e}")
-        except Exception as e: logging.error(f"Failed to process Tracker task '{task_title}': {e}", exc_info=True)
+def build_form_index(form):
+    """Indexes a form's questions by lower-cased title, keeping what an updateItem request needs."""
+    questions = {}
+    for i, item in enumerate(form.get('items', [])):
+        title_key = item.get('title', '').strip().lower()
+        question = item.get('questionItem', {}).get('question')
+        if not question or title_key in questions: continue
+        options = get_current_options(item)
+        questions[title_key] = {
+            'itemId': item.get('itemId'), 'questionId': question.get('questionId'), 'index': i, 'title': item.get('title'),
+            'options_fingerprint': get_options_fingerprint(options) if options is not None else None
+        }
+    return {'revision_id': form.get('revisionId'), 'questions': questions}
 
+def get_form_index(forms_service, form_id, state):
+    """Returns the cached question index of a form, refetching the full form only when its revisionId moved."""
+    form_structures = state.setdefault('form_structures', {})
+    revision_id = call_google_api('forms', forms_service.forms().get(formId=form_id, fields='revisionId').execute).get('revisionId')
+    if form_structures.get(form_id, {}).get('revision_id') != revision_id:
+        form_structures[form_id] = build_form_index(call_google_api('forms', forms_service.forms().get(formId=form_id).execute))
+    return form_structures[form_id]
 
-def handle_form_updater_tasks(creds, tasks, state, all_configs):
+def build_dropdown_requests(form_index, desired_options):
+    """Builds updateItem requests for the questions whose current options differ from `desired_options`.
+
+    Returns (requests, updated question titles, titles of all questions found in the form).
+    """
+    requests, updated_fields, matched_fields = [], [], []
+    for form_title, options_list in desired_options.items():
+        question = form_index['questions'].get(form_title.lower())
+        if not question: logging.warning(f"Question '{form_title}' not in form. Skipping."); continue
+        matched_fields.append(form_title)
+        if question['options_fingerprint'] == get_options_fingerprint(options_list): continue
+        dropdown_options = [{'value': opt} for opt in options_list]
+        new_item_body = {
+            'itemId': question['itemId'], 'title': question['title'],
+            'questionItem': {'question': {
+                'questionId': question['questionId'],
+                'required': True,
+                'choiceQuestion': {'type': 'DROP_DOWN', 'options': dropdown_options, 'shuffle': False}
+            }}}
+        request = {'updateItem': {'item': new_item_body, 'location': {'index': question['index']}, 'updateMask': 'questionItem'}}
+        requests.append(request)
+        updated_fields.append(form_title)
+    return requests, updated_fields, matched_fields
+
+def chunk_requests(requests, max_bytes=None):
+    """Splits requests into batches whose JSON size stays under `max_bytes` (an oversized request goes alone)."""
+    max_bytes = max_bytes or FORMS_MAX_REQUEST_BYTES
+    chunks, current, current_size = [], [], 0
+    for request in requests:
+        request_size = len(json.dumps(request))
+        if current and current_size + request_size > max_bytes:
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(request)
+        current_size += request_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def send_form_updates(forms_service, form_id, form_index, requests):
+    """Sends requests in size-bounded batchUpdate calls and keeps the cached index in step with the form.
+
+    Each call requires the revision the index was built from, so a form edited in the meantime fails
+    loudly instead of updating the wrong item positions.
+    """
+    for chunk in chunk_requests(requests):
+        body = {'requests': chunk}
+        if form_index.get('revision_id'):
+            body['writeControl'] = {'requiredRevisionId': form_index['revision_id']}
+        response = call_google_api('forms', forms_service.forms().batchUpdate(formId=form_id, body=body).execute)
+        form_index['revision_id'] = response.get('writeControl', {}).get('requiredRevisionId')
+        for request in chunk:
+            item = request['updateItem']['item']
+            question = form_index['questions'][item['title'].strip().lower()]
+            question['options_fingerprint'] = get_options_fingerprint([option['value'] for option in item['questionItem']['question']['choiceQuestion']['options']])
+
+def update_form(creds, task, task_state, excel_hash, desired_options, state):
+    """Brings one form's dropdowns in line with `desired_options`. Errors are logged and stay local to this form."""
+    task_title = task['title']
+    form_id = task.google_id
+    if SHUTDOWN_EVENT.is_set():
+        return
+    try:
+        check_deadline()
+        # Questions whose options match what we last pushed need no API call at all
+        pushed_fingerprints = task_state.setdefault('pushed_options', {})
+        changed_options = {title: options for title, options in desired_options.items() if pushed_fingerprints.get(title) != get_options_fingerprint(options)}
+        if not changed_options:
+            logging.info(f"Dropdown options for Form Updater '{task_title}' are unchanged. Skipping.")
+            task_state['last_excel_hash'] = excel_hash
+            return
+
+        logging.info(f"Change detected for '{task_title}'. Updating form dropdowns... (Form ID: {form_id})")
+        with service_slot('forms'):
+            forms_service = get_service('forms', 'v1', creds)
+            form_index = get_form_index(forms_service, form_id, state)
+            requests, updated_fields, matched_fields = build_dropdown_requests(form_index, changed_options)
+            if requests:
+                send_form_updates(forms_service, form_id, form_index, requests)
+        if requests:
+            logging.info(f"Successfully updated form for task '{task_title}'. Updated fields: {', '.join(updated_fields)}")
+        else:
+            logging.info(f"Form for task '{task_title}' already has the current dropdown options.")
+        
+        pushed_fingerprints.update({title: get_options_fingerprint(changed_options[title]) for title in matched_fields})
+        task_state['last_excel_hash'] = excel_hash
+        task_state['last_updated'] = datetime.datetime.now().isoformat()
+    except TaskTimeout:
+        raise # Reported once by the task graph; the cached structure is still valid
+    except Exception as e:
+        logging.error(f"Failed to process Form Updater task '{task_title}': {e}")
+        # The cached structure may no longer match the form; rebuild it next time
+        state.get('form_structures', {}).pop(form_id, None)
+
+def handle_form_updater_tasks(creds, tasks, state, workers=FORM_UPDATER_WORKERS):
+    """Updates form dropdowns, reading each master workbook once for all the forms that depend on it."""
     logging.info("Checking for Form Updater tasks...")
-    forms_service = build('forms', 'v1', credentials=creds)
+    tasks_by_excel = OrderedDict()
     for task in tasks:
         task_title, tracker_title, form_url_or_id = task.get('title'), task.get('tracker_title'), task.get('form_link')
-        tracker_task = next((t for t in all_configs.get('track_tasks', []) if t.get('title') == tracker_title), None)
+        tracker_task = task.tracker
         if not all([task_title, form_url_or_id, tracker_task]):
             logging.warning(f"Skipping invalid Form Updater task '{task_title}'. Could not find linked tracker task '{tracker_title}'.")
             continue
-        
-        excel_path = tracker_task.get('master_excel')
+        tasks_by_excel.setdefault(tracker_task.get('master_excel'), []).append(task)
+
+    form_updater_states = state.setdefault('form_updater_tasks', {})
+    state.setdefault('form_structures', {})
+    for excel_path, excel_tasks in tasks_by_excel.items():
         try:
             excel_hash = get_file_hash(excel_path)
-            task_state = state.setdefault('form_updater_tasks', {}).setdefault(task_title, {})
-            if task_state.get('last_excel_hash') == excel_hash:
-                logging.info(f"Source Excel for Form Updater '{task_title}' has not changed. Skipping.")
+            pending_tasks = []
+            for task in excel_tasks:
+                if form_updater_states.setdefault(task['title'], {}).get('last_excel_hash') == excel_hash:
+                    logging.info(f"Source Excel for Form Updater '{task['title']}' has not changed. Skipping.")
+                else:
+                    pending_tasks.append(task)
+            if not pending_tasks:
                 continue
-            
-            form_id = get_google_id_from_url(form_url_or_id)
-            logging.info(f"Change detected for '{task_title}'. Updating form dropdowns... (Form ID: {form_id})")
-            
-            df = pd.read_excel(excel_path)
-            field_mappings = {'Location': 'Location', 'Email': 'Email ID', 'SPOC Name': 'SPOC'}
-            form = forms_service.forms().get(formId=form_id).execute()
-            form_items = form.get('items', [])
-            requests, updated_fields = [], []
-            for form_title, excel_column in field_mappings.items():
-                if excel_column not in df.columns: logging.warning(f"Column '{excel_column}' not in Excel. Skipping '{form_title}'."); continue
-                options_list = df[excel_column].dropna().unique().tolist()
-                if not options_list: logging.warning(f"No data in column '{excel_column}'. Skipping '{form_title}'."); continue
-                target_item, target_index = None, -1
-                for i, item in enumerate(form_items):
-                    if item.get('title', '').strip().lower() == form_title.lower():
-                        target_item, target_index = item, i; break
-                if not target_item: logging.warning(f"Question '{form_title}' not in form. Skipping."); continue
-                dropdown_options = [{'value': str(opt)} for opt in options_list]
-                new_item_body = {
-                    'itemId': target_item.get('itemId'), 'title': target_item.get('title'),
-                    'questionItem': {'question': {
-                        'questionId': target_item['questionItem']['question']['questionId'],
-                        'required': True,
-                        'choiceQuestion': {'type': 'DROP_DOWN', 'options': dropdown_options, 'shuffle': False}
-                    }}}
-                request = {'updateItem': {'item': new_item_body, 'location': {'index': target_index}, 'updateMask': 'questionItem'}}
-                requests.append(request)
-                updated_fields.append(form_title)
-            if not requests: logging.warning(f"No matching questions or data to update in form for task '{task_title}'."); continue
-            body = {'requests': requests}
-            forms_service.forms().batchUpdate(formId=form_id, body=body).execute()
-            logging.info(f"Successfully updated form for task '{task_title}'. Updated fields: {', '.join(updated_fields)}")
-            
-            task_state['last_excel_hash'] = excel_hash
-            task_state['last_updated'] = datetime.datetime.now().isoformat()
-        except Exception as e: logging.error(f"Failed to process Form Updater task '{task_title}': {e}")
+            df = read_excel_cached(excel_path, list(FORM_FIELD_MAPPINGS.values()))
+            desired_options = get_dropdown_options(df, FORM_FIELD_MAPPINGS)
+        except Exception as e:
+            logging.error(f"Failed to read source Excel '{excel_path}' for Form Updater tasks {[task['title'] for task in excel_tasks]}: {e}")
+            continue
+
+        pool = get_thread_pool('form-updater', max(1, workers))
+        # Each form runs in a copy of this context, so it shares the task's deadline
+        wait([pool.submit(contextvars.copy_context().run, update_form, creds, task, form_updater_states[task['title']], excel_hash, desired_options, state) for task in pending_tasks])
+
+def is_reminder_day(task, day):
+    """Whether reminder `task` sends on `day`."""
+    if not (task.start_date <= day <= task.end_date):
+        return False
+    return task.get('frequency') == 'Everyday' or (task.get('frequency') == 'Select Dates' and str(day.day) in task.get('dates', []))
 
 def handle_reminder_tasks(config, tasks, state):
     logging.info("Checking for Reminder tasks...")
@@ -454,30 +1975,22 @@ def handle_reminder_tasks(config, tasks, state):
     for task in tasks:
         task_title = task.get('title')
         try:
-            start_date = datetime.datetime.strptime(task['start_date'], "%Y-%m-%d").date()
-            end_date = datetime.datetime.strptime(task['end_date'], "%Y-%m-%d").date()
-            
-            if not (start_date <= today <= end_date): continue
-
-            is_send_day = False
-            if task['frequency'] == 'Everyday':
-                is_send_day = True
-            elif task['frequency'] == 'Select Dates' and str(today.day) in task.get('dates', []):
-                is_send_day = True
-            
-            if not is_send_day: continue
+            if not is_reminder_day(task, today): continue
 
             logging.info(f"Processing reminders for task '{task_title}' on {today_str}")
-            tracker_title = task.get('tracker_title')
-            tracker_task = next((t for t in config.get('track_tasks', []) if t.get('title') == tracker_title), None)
-            if not tracker_task or not os.path.exists(tracker_task.get('result_path')):
+            tracker_task = task.tracker
+            if not tracker_task or not any(os.path.exists(get_tracker_output_path(tracker_task.get('result_path'), fmt)) for fmt in get_tracker_output_formats(tracker_task)):
                 logging.error(f"Could not find generated tracker file for reminder task '{task_title}'. Skipping.")
                 continue
 
-            df_tracker = pd.read_excel(tracker_task['result_path'])
+            df_tracker = read_tracker_results(tracker_task, ['Email ID', 'Uploaded'])
             task_state = state.setdefault('reminder_tasks', {}).setdefault(task_title, {})
             
             for _, row in df_tracker.iterrows():
+                if SHUTDOWN_EVENT.is_set():
+                    logging.info(f"Shutting down. Remaining reminders for '{task_title}' will be sent on restart.")
+                    break
+                check_deadline()
                 if row['Uploaded'] == 'No':
                     email_id = row['Email ID']
                     if pd.isna(email_id): continue # Skip if email is blank
@@ -489,50 +2002,628 @@ def handle_reminder_tasks(config, tasks, state):
                     logging.info(f"Sending reminder to {email_id} for task '{task_title}'.")
                     send_email(email_id, task['subject'], task['message'], config)
                     task_state[email_id] = today_str # Mark as sent for today
+                    save_state_entry(state, 'reminder_tasks', task_title) # Committed now, so a crash never re-sends it today
                     time.sleep(1)
+            else:
+                # Every row was handled; until this is recorded the task is retried during the day
+                state.setdefault('reminder_runs', {})[task_title] = today_str
 
+        except TaskTimeout: raise # Reported once by the task graph
         except Exception as e: logging.error(f"Failed to process Reminder task '{task_title}': {e}")
 
+# --- Scheduler ---
+DEFAULT_SYNC_INTERVAL_MINUTES = 1 # Drive/Tracker/Form Updater cadence unless 'interval_minutes' is set on the task or in settings
+MAX_IDLE_SECONDS = 300 # Longest sleep before task_log.json is checked for new or edited tasks
+RETRY_DELAY_SECONDS = 60 # Delay before retrying when config or credentials are unavailable
+TASK_KINDS = ['drive_tasks', 'emails', 'track_tasks', 'form_updater_tasks', 'reminders'] # Config keys, in run order
+GOOGLE_TASK_KINDS = ['drive_tasks', 'track_tasks', 'form_updater_tasks']
+
+def get_sync_interval(task, settings):
+    """Returns a sync task's interval as a timedelta."""
+    minutes = task.get('interval_minutes', settings.get('sync_interval_minutes', DEFAULT_SYNC_INTERVAL_MINUTES))
+    return datetime.timedelta(minutes=float(minutes))
+
+def get_next_due(kind, task, settings, last_run, now):
+    """Returns when `task` should next run given its last run in this process, or None if it never will."""
+    if kind in GOOGLE_TASK_KINDS:
+        return now if last_run is None else last_run + get_sync_interval(task, settings)
+
+    today = now.date()
+    if kind == 'emails':
+        send_date = task.send_date
+        if send_date < today or (last_run is not None and last_run.date() >= send_date):
+            return None
+        return max(now, datetime.datetime.combine(send_date, datetime.time()))
+
+    if kind == 'reminders':
+        start_date, end_date = task.start_date, task.end_date
+        day = max(today, start_date)
+        if last_run is not None and last_run.date() >= day:
+            day = last_run.date() + datetime.timedelta(days=1)
+        while day <= end_date:
+            if is_reminder_day(task, day):
+                return max(now, datetime.datetime.combine(day, datetime.time()))
+            day += datetime.timedelta(days=1)
+    return None
+
+def is_run_finished(kind, task, state, today):
+    """Whether a date-based email or reminder is done for `today`, judged from its persisted state.
+
+    A run that failed, e.g. on a missing workbook or tracker file, is not finished and is retried.
+    """
+    today_str = today.strftime(DATE_FORMAT)
+    if kind == 'emails':
+        return task.get('date') != today_str or bool(state.get('email_tasks', {}).get(f"{task['title']}_{today_str}"))
+    if kind == 'reminders':
+        return not is_reminder_day(task, today) or state.get('reminder_runs', {}).get(task['title']) == today_str
+    return True
+
+class TaskScheduler:
+    """Priority queue of next-due times per task, so the daemon sleeps exactly until something is due.
+
+    Tasks are keyed by (config kind, title). Rescheduling a task leaves its old heap entry behind;
+    stale entries are recognised by comparing them with `due` and dropped when they surface.
+    """
+    def __init__(self):
+        self.due = {} # (kind, title) -> datetime
+        self.last_run = {} # (kind, title) -> datetime of the last run in this process
+        self._heap = []
+        self._counter = itertools.count()
+
+    def schedule(self, key, due_time):
+        if due_time is None:
+            self.due.pop(key, None)
+            return
+        self.due[key] = due_time
+        heapq.heappush(self._heap, (due_time, next(self._counter), key))
+
+    def load(self, config, now):
+        """Rebuilds the queue from the config, keeping the last run times of tasks that still exist."""
+        settings = config.get('settings', {})
+        self.due, self._heap = {}, []
+        for kind in TASK_KINDS:
+            for task in config.get(kind, []):
+                if task.get('title'):
+                    key = (kind, task['title'])
+                    self.schedule(key, get_next_due(kind, task, settings, self.last_run.get(key), now))
+
+    def pop_due(self, now):
+        """Removes and returns the keys of all tasks due at `now`."""
+        due_keys = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, key = heapq.heappop(self._heap)
+            if self.due.get(key) == due_time:
+                del self.due[key]
+                due_keys.append(key)
+        return due_keys
+
+    def seconds_until_next(self, now):
+        while self._heap and self.due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, (self._heap[0][0] - now).total_seconds())
+
+# --- Task Graph ---
+MAX_CONCURRENT_TASKS = 4 # Default number of tasks running at once; set 'max_concurrent_tasks' in settings
+SERVICE_CONCURRENCY = {'drive': 2, 'sheets': 2, 'forms': 2, 'smtp': 1} # Default per-service caps; override with 'service_concurrency' in settings
+_service_settings = {} # The settings below were applied from; tracker worker processes are configured from them too
+_service_limits = {}
+_service_semaphores = {}
+SHUTDOWN_EVENT = threading.Event() # Set on shutdown: tasks that have not started are skipped and long handlers stop at their next item
+
+def configure_service_limits(settings):
+    """Sets the per-service concurrency caps and per-API request rates that keep concurrent tasks within Google API quotas."""
+    global _service_settings, _service_limits, _service_semaphores, _api_buckets, _api_timeout_seconds
+    _service_settings = {key: settings[key] for key in ('api_timeout_seconds', 'service_concurrency', 'api_rate_limits') if key in settings}
+    _api_timeout_seconds = float(settings.get('api_timeout_seconds', API_TIMEOUT_SECONDS))
+    _service_limits = {service: max(1, int(limit)) for service, limit in dict(SERVICE_CONCURRENCY, **settings.get('service_concurrency', {})).items()}
+    _service_semaphores = {service: threading.BoundedSemaphore(limit) for service, limit in _service_limits.items()}
+    rate_limits = dict(API_RATE_LIMITS, **settings.get('api_rate_limits', {}))
+    _api_buckets = {api: TokenBucket(rate, burst) for api, (rate, burst) in rate_limits.items()}
+
+@contextlib.contextmanager
+def service_slot(service):
+    """Holds one of the concurrency slots of `service` (no-op for unknown or None services)."""
+    semaphore = _service_semaphores.get(service)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+class _GraphRun:
+    """Dependency bookkeeping of one TaskGraph run, shared by its threaded and asyncio loops.
+
+    `submit(key)` starts a node and returns a future; the loops differ only in how they wait on those
+    futures and where they call on_done.
+    """
+    def __init__(self, graph, submit):
+        self.graph, self.submit = graph, submit
+        self.running = {} # future -> key
+        # Dependencies on keys that are not part of the graph are ignored
+        self.waiting_on = {key: {dep for dep in deps if dep in graph._nodes and dep != key} for key, (_, _, deps) in graph._nodes.items()}
+        self.dependents = {}
+        for key, deps in self.waiting_on.items():
+            for dep in deps:
+                self.dependents.setdefault(dep, []).append(key)
+
+    def start_ready(self):
+        """Submits every node whose dependencies have all finished; returns False once nothing is running."""
+        for key in [key for key, deps in self.waiting_on.items() if not deps]:
+            del self.waiting_on[key]
+            self.running[self.submit(key)] = key
+        return bool(self.running)
+
+    def finished(self, done):
+        """Releases the dependents of the `done` futures and returns the keys of those that need on_done."""
+        finished_keys = []
+        for future in done:
+            key = self.running.pop(future)
+            for dependent in self.dependents.get(key, []):
+                self.waiting_on[dependent].discard(key)
+            if key not in self.graph.skipped:
+                finished_keys.append(key)
+        return finished_keys
+
+    def report_unrun(self):
+        if self.waiting_on:
+            logging.error(f"Tasks with circular dependencies were not run: {list(self.waiting_on)}")
+
+class TaskGraph:
+    """Runs callables on a bounded thread pool, starting each one once all of its dependencies finished.
+
+    Dependencies on keys that are not part of the graph are ignored. A failing node is logged and still
+    releases its dependents, matching the sequential behaviour where every handler always ran.
+    """
+    def __init__(self, max_workers, on_done=None, claim=None):
+        self.max_workers = max(1, max_workers)
+        self.on_done = on_done # Called with each node's key on the calling thread once the node finished
+        self.claim = claim # Called with a node's key on its worker right before it runs; the node is skipped unless it returns True
+        self.timed_out = set() # Keys of nodes that ran past their deadline
+        self.skipped = set() # Keys of nodes whose claim failed; on_done is not called for them
+        self._nodes = OrderedDict() # key -> (fn, service, depends_on)
+        self._timeouts = {} # key -> time budget in seconds
+
+    def add(self, key, fn, service=None, depends_on=(), timeout=None):
+        self._nodes[key] = (fn, service, list(depends_on))
+        self._timeouts[key] = timeout
+
+    def run(self):
+        pool = get_thread_pool('task', self.max_workers)
+        run = _GraphRun(self, lambda key: pool.submit(contextvars.copy_context().run, self._run_node, key))
+        while run.start_ready():
+            done, _ = wait(run.running, return_when=FIRST_COMPLETED)
+            for key in run.finished(done):
+                self._finish_node(key)
+        run.report_unrun()
+
+    async def run_async(self):
+        """asyncio counterpart of run(), with all waiting on the event loop.
+
+        Nodes that use one service (Drive, SMTP) run on that service's own executor behind an asyncio
+        semaphore at its cap, so I/O-bound nodes overlap instead of queueing for the max_workers pool;
+        the others still run on the task pool. Cancelling it stops nodes from starting; nodes already
+        running are awaited (they stop early once SHUTDOWN_EVENT is set) so their state is saved before
+        their leases are released.
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_thread_pool('task', self.max_workers)
+        service_gates = {}
+        async def run_node(key):
+            service = self._nodes[key][1]
+            limit = _service_limits.get(service)
+            if limit is None:
+                return await loop.run_in_executor(pool, contextvars.copy_context().run, self._run_node, key)
+            async with service_gates.setdefault(service, asyncio.Semaphore(limit)):
+                return await loop.run_in_executor(get_thread_pool(f"task-{service}", limit), contextvars.copy_context().run, self._run_node, key)
+        run = _GraphRun(self, lambda key: asyncio.ensure_future(run_node(key)))
+        try:
+            while run.start_ready():
+                done, _ = await asyncio.wait(run.running, return_when=asyncio.FIRST_COMPLETED)
+                for key in run.finished(done):
+                    await loop.run_in_executor(None, self._finish_node, key)
+        except asyncio.CancelledError:
+            SHUTDOWN_EVENT.set()
+            if run.running:
+                done, _ = await asyncio.wait(run.running)
+                for key in run.finished(done):
+                    self._finish_node(key)
+            raise
+        run.report_unrun()
+
+    def _finish_node(self, key):
+        if self.on_done:
+            try:
+                self.on_done(key)
+            except Exception as e:
+                logging.error(f"Post-processing of task '{key[1]}' failed: {e}")
+
+    def _run_node(self, key):
+        fn, service, _ = self._nodes[key]
+        timeout = self._timeouts.get(key)
+        # Claiming here rather than when the graph is built means each worker takes on new work as soon as it is free
+        if self.claim is not None:
+            try:
+                claimed = not SHUTDOWN_EVENT.is_set() and self.claim(key)
+            except Exception as e:
+                logging.error(f"Could not claim task '{key[1]}': {e}")
+                claimed = False
+            if not claimed:
+                self.skipped.add(key)
+                return
+        try:
+            with service_slot(service):
+                # Checked after the slot is granted too, since waiting for it can outlast a shutdown request
+                if not SHUTDOWN_EVENT.is_set():
+                    # The budget starts once the task actually runs; handlers enforce it through check_deadline()
+                    deadline = Deadline(time.time() + timeout) if timeout else None
+                    token = _task_deadline.set(deadline)
+                    started, outcome = time.perf_counter(), 'error'
+                    try:
+                        with log_span('task', handler=key[0], task=key[1]) as span:
+                            try:
+                                with PROFILER.task(key):
+                                    fn()
+                                outcome = 'ok'
+                            except TaskTimeout:
+                                pass # The handler stopped at a checkpoint; reported below as a timeout
+                            finally:
+                                _task_deadline.reset(token)
+                                if deadline is not None and deadline.exceeded:
+                                    outcome = 'timeout'
+                                span['outcome'] = outcome
+                    finally:
+                        duration = time.perf_counter() - started
+                        METRICS.observe('headless_handler_duration_seconds', duration, handler=key[0])
+                        METRICS.observe('headless_task_duration_seconds', duration, handler=key[0], task=key[1])
+                        METRICS.inc('headless_task_runs_total', handler=key[0], outcome=outcome)
+                    if outcome == 'timeout':
+                        self.timed_out.add(key)
+                        logging.warning(f"Task '{key[1]}' ran out of its {timeout:.0f}s time budget and will resume on its next run.")
+        except Exception as e:
+            logging.error(f"Task '{key[1]}' failed: {e}", exc_info=True)
+
+def plan_due_tasks(config, due_keys):
+    """Claims the due tasks and builds the task graph that runs them through their handlers.
+
+    Returns (graph, retry_keys, finish): retry_keys maps the keys that will not run here to a retry
+    delay in seconds, and finish() saves the state and releases the leases once the graph has run.
+    """
+    due_titles = {}
+    for kind, title in due_keys:
+        due_titles.setdefault(kind, set()).add(title)
+    tasks = {kind: [config.by_title[kind][title] for title in due_titles.get(kind, ()) if title in config.by_title[kind]] for kind in TASK_KINDS}
+    settings = config.get('settings', {})
+
+    creds, retry_keys = None, {}
+    if any(tasks[kind] for kind in GOOGLE_TASK_KINDS):
+        creds = get_creds()
+        if not creds:
+            logging.critical("Could not obtain Google credentials. Google tasks will be retried shortly.")
+            retry_keys = {key: RETRY_DELAY_SECONDS for key in due_keys if key[0] in GOOGLE_TASK_KINDS}
+            for kind in GOOGLE_TASK_KINDS:
+                tasks[kind] = []
+
+    # Every due task becomes a node, and a node claims its lease only once a worker is free to run it, so concurrent
+    # headless instances split the due tasks between them as they go. Tasks leased by another instance are left to it.
+    # Entries other instances changed are refreshed on each claim, and saved before each lease is released, so a task never runs on stale state
+    max_workers = max(1, int(settings.get('max_concurrent_tasks', MAX_CONCURRENT_TASKS)))
+    state = load_state()
+    claimed_keys = set()
+    lease_keys = {} # graph node -> lease keys it claims and releases when done
+    def claim_node(key):
+        claimed = TASK_LEASES.claim(lease_keys.get(key, [key]))
+        if not claimed:
+            return False
+        if key in lease_keys:
+            # A form updater group runs the tasks whose leases it got; the rest are left to the instances holding them
+            claimed_titles = {title for _, title in claimed}
+            form_groups[key[1]][:] = [task for task in form_groups[key[1]] if task['title'] in claimed_titles]
+            lease_keys[key] = claimed
+        claimed_keys.update(claimed)
+        refresh_state(state)
+        return True
+    def finish_node(key):
+        # Timed-out tasks are recorded and retried shortly; their handlers kept enough state to resume
+        timeouts = state.setdefault('timeouts', {})
+        for lease_key in lease_keys.get(key, [key]):
+            if key in graph.timed_out:
+                timeouts[f"{lease_key[0]}/{lease_key[1]}"] = datetime.datetime.now().isoformat()
+                retry_keys[lease_key] = RETRY_DELAY_SECONDS
+            else:
+                timeouts.pop(f"{lease_key[0]}/{lease_key[1]}", None)
+                if not is_run_finished(lease_key[0], config.get_task(*lease_key), state, datetime.date.today()):
+                    retry_keys[lease_key] = RETRY_DELAY_SECONDS
+        # Only the entries this node's tasks own are written; walking the whole state after every node is slow with large reminder logs
+        save_state_entries(state, [entry_key for lease_key in lease_keys.get(key, [key]) for entry_key in get_task_state_keys(lease_key[0], config.get_task(*lease_key))])
+        TASK_LEASES.release(lease_keys.get(key, [key]))
+    def get_timeout(task):
+        return 60 * float(task.get('timeout_minutes', settings.get('task_timeout_minutes', TASK_TIMEOUT_MINUTES)))
+
+    # Independent tasks run concurrently; form updaters and reminders wait for their linked tracker
+    graph = TaskGraph(max_workers, on_done=finish_node, claim=claim_node)
+    for task in tasks['drive_tasks']:
+        graph.add(('drive_tasks', task['title']), functools.partial(handle_drive_tasks, creds, [task], state), 'drive', timeout=get_timeout(task))
+    for task in tasks['emails']:
+        graph.add(('emails', task['title']), functools.partial(handle_email_tasks, config, [task], state), 'smtp', timeout=get_timeout(task))
+    for task in tasks['track_tasks']:
+        graph.add(('track_tasks', task['title']), functools.partial(handle_tracker_tasks, creds, [task], state, int(settings.get('tracker_workers', TRACKER_WORKERS))), timeout=get_timeout(task))
+    # Form updaters stay grouped by master workbook so each workbook is still read once
+    form_groups = OrderedDict()
+    for task in tasks['form_updater_tasks']:
+        form_groups.setdefault(task.tracker.get('master_excel') if task.tracker else None, []).append(task)
+    for excel_path, group in form_groups.items():
+        lease_keys[('form_updater_tasks', excel_path)] = [('form_updater_tasks', task['title']) for task in group]
+        graph.add(('form_updater_tasks', excel_path), functools.partial(handle_form_updater_tasks, creds, group, state, int(settings.get('form_updater_workers', FORM_UPDATER_WORKERS))),
+                  depends_on=[('track_tasks', task.get('tracker_title')) for task in group], timeout=max(get_timeout(task) for task in group))
+    for task in tasks['reminders']:
+        graph.add(('reminders', task['title']), functools.partial(handle_reminder_tasks, config, [task], state), 'smtp', depends_on=[('track_tasks', task.get('tracker_title'))], timeout=get_timeout(task))
+
+    def finish():
+        if graph.skipped and not SHUTDOWN_EVENT.is_set():
+            logging.info(f"Skipped {len(graph.skipped)} task(s) leased by another instance.")
+        # A skipped email or reminder is not done here: it is tried again once the other lease could have expired, and
+        # its refreshed state then decides whether the other instance finished it. Sync tasks come back on their interval anyway
+        retry_keys.update({key: LEASE_SECONDS for key in graph.skipped if key[0] not in GOOGLE_TASK_KINDS})
+        # Save the updated state, including anything a handler wrote outside its own entries
+        save_state(state)
+        TASK_LEASES.release(claimed_keys)
+    return graph, retry_keys, finish
+
+def run_due_tasks(config, due_keys):
+    """Runs the due tasks and saves the state.
+
+    Returns {key: seconds} for the keys that did not run here and should be retried after that delay.
+    """
+    with METRICS.timer('headless_cycle_duration_seconds'), log_span('cycle', tasks=len(due_keys)), PROFILER.cycle():
+        graph, retry_keys, finish = plan_due_tasks(config, due_keys)
+        try:
+            graph.run()
+        finally:
+            finish()
+    return retry_keys
+
+async def run_due_tasks_async(config, due_keys):
+    """asyncio counterpart of run_due_tasks()."""
+    loop = asyncio.get_running_loop()
+    with METRICS.timer('headless_cycle_duration_seconds'), log_span('cycle', tasks=len(due_keys)), PROFILER.cycle():
+        graph, retry_keys, finish = await loop.run_in_executor(None, plan_due_tasks, config, due_keys)
+        try:
+            await graph.run_async()
+        finally:
+            await asyncio.shield(loop.run_in_executor(None, finish))
+    return retry_keys
+
+# --- File Watching ---
+WATCH_DEBOUNCE_SECONDS = 2.0 # A changed file must keep the same size and mtime this long before it counts as changed
+WATCH_POLL_SECONDS = 2.0 # How often files are stat-ed when watchdog is not installed
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class FileWatcher:
+    """Watches a set of files and reports each settled change once through `on_change(path)`.
+
+    Uses watchdog (inotify, ReadDirectoryChangesW, FSEvents) when it is installed and stat polling
+    otherwise. Either way a change is only reported once the file's size and mtime have stopped
+    moving for WATCH_DEBOUNCE_SECONDS, so a workbook Excel is still saving does not cause duplicate runs.
+    """
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self._baselines = {} # path -> fingerprint of the last reported version
+        self._pending = {} # path -> (monotonic time of the last movement, fingerprint seen then)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._observer = None
+        self._watches = {} # directory -> watchdog watch
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.start()
+        threading.Thread(target=self._run, name='file-watcher', daemon=True).start()
+
+    def set_paths(self, paths):
+        """Replaces the set of watched files."""
+        paths = {normalize_path(path) for path in paths if path}
+        with self._lock:
+            self._baselines = {path: self._baselines.get(path, get_file_fingerprint(path)) for path in paths}
+            self._pending = {path: pending for path, pending in self._pending.items() if path in paths}
+        if self._observer is not None:
+            directories = {os.path.dirname(path) for path in paths}
+            for directory in set(self._watches) - directories:
+                self._observer.unschedule(self._watches.pop(directory))
+            for directory in directories - set(self._watches):
+                try:
+                    self._watches[directory] = self._observer.schedule(self, directory, recursive=False)
+                except OSError as e:
+                    logging.warning(f"Cannot watch '{directory}' for changes: {e}")
+
+    def dispatch(self, event):
+        """watchdog callback: marks the touched paths as pending."""
+        for path in [event.src_path, getattr(event, 'dest_path', None)]:
+            if path:
+                self._mark_pending(normalize_path(path))
+
+    def _mark_pending(self, path):
+        with self._lock:
+            if path in self._baselines and path not in self._pending:
+                self._pending[path] = (time.monotonic(), get_file_fingerprint(path))
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(WATCH_DEBOUNCE_SECONDS / 2 if self._pending else WATCH_POLL_SECONDS)
+            self._wakeup.clear()
+            if self._observer is None:
+                for path, baseline in list(self._baselines.items()):
+                    if get_file_fingerprint(path) != baseline:
+                        self._mark_pending(path)
+
+            now, settled = time.monotonic(), []
+            with self._lock:
+                for path, (last_moved, last_fingerprint) in list(self._pending.items()):
+                    fingerprint = get_file_fingerprint(path)
+                    if fingerprint != last_fingerprint:
+                        self._pending[path] = (now, fingerprint)
+                    elif now - last_moved >= WATCH_DEBOUNCE_SECONDS:
+                        del self._pending[path]
+                        if path in self._baselines and fingerprint != self._baselines[path]:
+                            self._baselines[path] = fingerprint
+                            settled.append(path)
+            for path in settled:
+                self.on_change(path)
+
+def get_watched_paths(config):
+    """Returns the config file plus every workbook referenced by Tracker and Email tasks."""
+    return [CONFIG_FILE] + [task.get('master_excel') for task in config.get('track_tasks', [])] + [task.get('excel') for task in config.get('emails', [])]
+
+def get_dependent_task_keys(config, path):
+    """Returns the scheduler keys of the tasks that read the workbook at `path`."""
+    trackers = [task for task in config.get('track_tasks', []) if task.get('master_excel') and normalize_path(task['master_excel']) == path]
+    tracker_titles = {task.get('title') for task in trackers}
+    keys = [('track_tasks', task.get('title')) for task in trackers]
+    keys += [('form_updater_tasks', task.get('title')) for task in config.get('form_updater_tasks', []) if task.get('tracker_title') in tracker_titles]
+    keys += [('emails', task.get('title')) for task in config.get('emails', []) if task.get('excel') and normalize_path(task['excel']) == path]
+    return [key for key in keys if key[1]]
+
 # --- Main Execution ---
+class Daemon:
+    """Scheduling state shared by the threaded and the asyncio main loops."""
+    def __init__(self, on_wake):
+        self.scheduler = TaskScheduler()
+        self.config, self.last_compaction = None, None
+        # File changes wake the loop early (through on_wake) and make the tasks that read the changed file due immediately
+        self.changed_paths = queue.Queue()
+        self.watcher = FileWatcher(lambda path: (self.changed_paths.put(path), on_wake()))
+
+    def refresh(self, now):
+        """Applies file changes and config edits. Returns False when there is no usable configuration."""
+        while not self.changed_paths.empty():
+            path = self.changed_paths.get()
+            if path == normalize_path(CONFIG_FILE):
+                continue # Picked up by load_config() below
+            for key in get_dependent_task_keys(self.config, path):
+                # Date-based emails are only pulled forward while they are still pending
+                if key[0] != 'emails' or key in self.scheduler.due:
+                    logging.info(f"'{path}' changed. Running '{key[1]}' now.")
+                    self.scheduler.schedule(key, now)
+
+        loaded = load_config()
+        if not loaded:
+            logging.warning("Configuration file is empty or not found. Waiting before checking again.")
+            return False
+        if loaded is not self.config:
+            self.config = config = loaded
+            WORKBOOK_CACHE.set_budget(int(config.get('settings', {}).get('workbook_cache_mb', WORKBOOK_CACHE_MB)) * 1024 * 1024)
+            configure_service_limits(config.get('settings', {}))
+            configure_log_format(config.get('settings', {}).get('log_format', 'text'))
+            PROFILER.configure(config.get('settings', {}))
+            if config.get('settings', {}).get('metrics_port'):
+                start_metrics_server(config['settings']['metrics_port'])
+            self.scheduler.load(config, now)
+            self.watcher.set_paths(get_watched_paths(config))
+            logging.info(f"Loaded configuration with {len(self.scheduler.due)} scheduled task(s).")
+
+        # Stale run keys and state of deleted tasks are compacted away once a day
+        if self.last_compaction is None or now - self.last_compaction >= datetime.timedelta(days=1):
+            STATE_STORE.compact(self.config, now)
+            self.last_compaction = now
+        return True
+
+    def reschedule(self, due_keys, retry_keys):
+        settings = self.config.get('settings', {})
+        finished = datetime.datetime.now()
+        for key in due_keys:
+            if key in retry_keys:
+                self.scheduler.schedule(key, finished + datetime.timedelta(seconds=retry_keys[key]))
+            else:
+                self.scheduler.last_run[key] = finished
+                self.scheduler.schedule(key, get_next_due(key[0], self.config.get_task(*key), settings, finished, finished))
+
+    def seconds_until_next(self):
+        wait_seconds = self.scheduler.seconds_until_next(datetime.datetime.now())
+        wait_seconds = MAX_IDLE_SECONDS if wait_seconds is None else min(wait_seconds, MAX_IDLE_SECONDS)
+        logging.info(f"--- Next task due in {wait_seconds:.0f}s. Sleeping... ---")
+        return wait_seconds
+
 def main():
-    """Main function to run tasks in a continuous loop."""
+    """Main function: sleeps until the next task is due, runs it, and reschedules it."""
+    wake_event = threading.Event()
+    daemon = Daemon(wake_event.set)
     while True:
-        logging.info("--- Starting new automation cycle ---")
-        
-        config = load_config()
-        if not config:
-            logging.warning("Configuration file is empty or not found. Waiting for next cycle.")
-            time.sleep(60)
+        wake_event.clear()
+        now = datetime.datetime.now()
+        if not daemon.refresh(now):
+            time.sleep(RETRY_DELAY_SECONDS)
             continue
-            
-        state = load_state()
-        creds = get_creds()
-        
-        if not creds:
-            logging.critical("Could not obtain Google credentials. Waiting for next cycle.")
-            time.sleep(60)
+
+        due_keys = daemon.scheduler.pop_due(now)
+        if due_keys:
+            logging.info(f"--- Running {len(due_keys)} due task(s) ---")
+            daemon.reschedule(due_keys, run_due_tasks(daemon.config, due_keys))
             continue
 
-        # Process tasks if they exist in config
-        if "drive_tasks" in config:
-            handle_drive_tasks(creds, config["drive_tasks"], state)
-        
-        if "emails" in config:
-            handle_email_tasks(config, config["emails"], state)
-            
-        if "track_tasks" in config:
-            handle_tracker_tasks(creds, config["track_tasks"], state)
+        wake_event.wait(daemon.seconds_until_next())
 
-        if "form_updater_tasks" in config:
-            handle_form_updater_tasks(creds, config["form_updater_tasks"], state, config)
-            
-        if "reminders" in config:
-            handle_reminder_tasks(config, config["reminders"], state)
+async def main_async():
+    """asyncio main loop: same scheduling as main(), with all waiting done on the event loop.
 
-        # Save the updated state
-        save_state(state)
-        logging.info("--- Automation cycle finished. Waiting for 1 minute... ---")
-        time.sleep(60)
+    Handlers still run on the task thread pool, since the Google client, SMTP and Excel libraries
+    only offer blocking calls. SIGINT/SIGTERM cancel the running cycle: tasks that have not started
+    are dropped, running ones stop at their next item, and the state is saved before exiting.
+    """
+    loop = asyncio.get_running_loop()
+    wake, stop = asyncio.Event(), asyncio.Event()
+    daemon = Daemon(lambda: loop.call_soon_threadsafe(wake.set))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass # Windows: Ctrl+C still raises KeyboardInterrupt
+    stop_waiter = asyncio.ensure_future(stop.wait())
+    try:
+        while not stop.is_set():
+            wake.clear()
+            now = datetime.datetime.now()
+            if not await loop.run_in_executor(None, daemon.refresh, now):
+                await asyncio.wait([stop_waiter], timeout=RETRY_DELAY_SECONDS)
+                continue
+
+            due_keys = daemon.scheduler.pop_due(now)
+            if due_keys:
+                logging.info(f"--- Running {len(due_keys)} due task(s) ---")
+                cycle = asyncio.ensure_future(run_due_tasks_async(daemon.config, due_keys))
+                await asyncio.wait([cycle, stop_waiter], return_when=asyncio.FIRST_COMPLETED)
+                if not cycle.done():
+                    logging.info("Shutdown requested. Cancelling tasks that have not started and waiting for running ones...")
+                    cycle.cancel()
+                    await asyncio.wait([cycle])
+                    break
+                daemon.reschedule(due_keys, cycle.result())
+                continue
+
+            waker = asyncio.ensure_future(wake.wait())
+            await asyncio.wait([waker, stop_waiter], timeout=daemon.seconds_until_next(), return_when=asyncio.FIRST_COMPLETED)
+            waker.cancel()
+    finally:
+        stop_waiter.cancel()
+        SHUTDOWN_EVENT.set()
+        shutdown_tracker_pool()
+        logging.info("Headless engine stopped.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Runs the tasks from task_log.json without the GUI.")
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads',
+                        help="'asyncio' runs the scheduler on an event loop and shuts down cleanly on SIGINT/SIGTERM")
+    parser.add_argument('--profile-cycles', type=int, default=0, metavar='N',
+                        help=f"write cProfile and tracemalloc dumps for the first N cycles to ./{PROFILES_DIR}")
+    parser.add_argument('--profile-task', metavar='TITLE', help="profile the next run of the task with this title")
+    args = parser.parse_args()
+    PROFILER.request(args.profile_cycles, args.profile_task)
+    if hasattr(signal, 'SIGUSR1'): # `kill -USR1 <pid>` profiles the next cycle of the running daemon
+        signal.signal(signal.SIGUSR1, lambda signum, frame: PROFILER.request(cycles=max(PROFILER.pending_cycles, 1)))
+    if args.engine == 'asyncio':
+        asyncio.run(main_async())
+    else:
+        main()
@@ -0,0 +1,470 @@
+"""Soak test for headless.py.py.
+
+Runs the daemon's main() for thousands of cycles on an accelerated clock, against local stand-ins for
+Drive, Sheets, Forms and SMTP and a synthetic task_log.json with hundreds of tasks. RSS, open file
+descriptors and cycle durations are sampled as it goes, and the run fails when they grow past the
+thresholds. Nothing talks to Google or a mail server.
+
+    python soak.py.py --cycles 3000 --tasks 400
+
+With --processes N it instead runs N copies of the daemon's task runner in separate processes that
+share one state database, all offered every task once per simulated day, and fails if any email or
+reminder went out more than once or a scheduled email was never sent:
+
+    python soak.py.py --processes 4 --cycles 10 --tasks 100
+
+Everything is written to a scratch directory (a new temporary one unless --workdir is given),
+including soak_report.csv with one row per sample.
+"""
+import sys
+import os
+import json
+import email
+import logging
+import datetime
+import time
+import random
+import re
+import gc
+import types
+import argparse
+import tempfile
+import statistics
+import threading
+import collections
+import multiprocessing
+import importlib.util
+import pandas as pd
+
+# Optional: psutil reads RSS and handle counts on every platform; /proc is used without it (Linux only)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+HEADLESS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'headless.py.py')
+MASTER_ROWS = 60 # People per synthetic master workbook
+FILES_PER_FOLDER = 5 # Files in each fake Drive folder
+PACING_SECONDS = 1 # Sleeps this short (the per-recipient email pacing) return at once on the accelerated clock
+
+class SoakFinished(Exception):
+    """Raised after the last cycle to leave main()."""
+
+# --- Accelerated Clock ---
+class SimulatedClock:
+    """Wall-clock offset added to every datetime the daemon reads, so idle waits take no real time."""
+    def __init__(self):
+        self.offset = datetime.timedelta()
+
+    def advance(self, seconds):
+        self.offset += datetime.timedelta(seconds=seconds)
+
+CLOCK = SimulatedClock()
+
+class SoakDateTime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.datetime.now(tz) + CLOCK.offset
+
+class SoakDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return SoakDateTime.now().date()
+
+def soak_sleep(seconds):
+    time.sleep(0 if seconds <= PACING_SECONDS else seconds)
+
+# --- Fake Google Services ---
+class FakeRequest:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self, **kwargs):
+        return self.fn()
+
+class FakeDrive:
+    """Folders of binary files whose checksums change when `touch` is called."""
+    def __init__(self, folder_ids):
+        self.versions = {(folder_id, n): 1 for folder_id in folder_ids for n in range(FILES_PER_FOLDER)}
+        self._lock = threading.Lock()
+
+    def files(self):
+        return self
+
+    def list(self, q, fields=None):
+        folder_id = re.search(r"'([^']+)' in parents", q).group(1)
+        with self._lock:
+            files = [{'id': f"{folder_id}:{n}", 'name': f"file{n}.bin", 'mimeType': 'application/octet-stream',
+                      'modifiedTime': f"v{self.versions[(folder_id, n)]}", 'md5Checksum': f"{folder_id}-{n}-{self.versions[(folder_id, n)]}"}
+                     for n in range(FILES_PER_FOLDER)]
+        return FakeRequest(lambda: {'files': files})
+
+    def get_media(self, fileId):
+        return FakeRequest(lambda: os.urandom(4096))
+
+    def touch(self, rng):
+        with self._lock:
+            key = rng.choice(list(self.versions))
+            self.versions[key] += 1
+
+class FakeDownloader:
+    def __init__(self, fh, request):
+        self.fh, self.request = fh, request
+
+    def next_chunk(self):
+        self.fh.write(self.request.execute())
+        return None, True
+
+class FakeSheets:
+    """Form response sheets that grow when `add_response` is called."""
+    HEADER = ['Timestamp', 'Email', 'Location', 'Upload the Applicable Documents']
+
+    def __init__(self, sheet_ids):
+        self.rows = {sheet_id: [] for sheet_id in sheet_ids}
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields=None, range=None):
+        with self._lock:
+            row_count = len(self.rows[spreadsheetId]) + 1
+        if range is None:
+            return FakeRequest(lambda: {'sheets': [{'properties': {'title': 'Form Responses 1', 'gridProperties': {'rowCount': row_count}}}]})
+        return FakeRequest(lambda: {'values': [self.HEADER]})
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension=None):
+        with self._lock:
+            grid = [self.HEADER] + list(self.rows[spreadsheetId])
+        value_ranges = []
+        for cell_range in ranges:
+            letters, first, last = re.search(r'!([A-Z]+)(\d+):[A-Z]+(\d+)', cell_range).groups()
+            column = 0
+            for letter in letters:
+                column = column * 26 + ord(letter) - 64
+            values = [row[column - 1] for row in grid[int(first) - 1:int(last)]]
+            value_ranges.append({'values': [values]} if values else {})
+        return FakeRequest(lambda: {'valueRanges': value_ranges})
+
+    def add_response(self, rng, people):
+        email, location = rng.choice(people)
+        with self._lock:
+            sheet_id = rng.choice(list(self.rows))
+            self.rows[sheet_id].append([SoakDateTime.now().isoformat(), email, location, f"https://drive.google.com/open?id=doc{rng.randrange(10**6)}"])
+
+class FakeForms:
+    """Forms with the three dropdown questions the form updater manages."""
+    def __init__(self, form_ids):
+        self.forms_by_id = {form_id: {'revisionId': 1, 'items': [
+            {'itemId': f"i{n}", 'title': title, 'questionItem': {'question': {'questionId': f"q{n}", 'choiceQuestion': {'type': 'DROP_DOWN', 'options': [{'value': 'placeholder'}]}}}}
+            for n, title in enumerate(['Location', 'Email', 'SPOC Name'])]} for form_id in form_ids}
+        self._lock = threading.Lock()
+
+    def forms(self):
+        return self
+
+    def get(self, formId, fields=None):
+        with self._lock:
+            form = json.loads(json.dumps(self.forms_by_id[formId]))
+        form['revisionId'] = str(form['revisionId'])
+        return FakeRequest(lambda: {'revisionId': form['revisionId']} if fields else form)
+
+    def batchUpdate(self, formId, body):
+        with self._lock:
+            form = self.forms_by_id[formId]
+            for request in body['requests']:
+                item = request['updateItem']
+                form['items'][item['location']['index']]['questionItem'] = item['item']['questionItem']
+            form['revisionId'] += 1
+            revision = str(form['revisionId'])
+        return FakeRequest(lambda: {'writeControl': {'requiredRevisionId': revision}})
+
+class FakeSMTP:
+    sent = 0
+    log_path = None # When set, each message is appended as [recipient, subject, simulated date] for the --processes check
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        FakeSMTP.sent += 1
+        if FakeSMTP.log_path:
+            subject = email.message_from_string(msg)['Subject']
+            with open(FakeSMTP.log_path, 'a') as f:
+                f.writelines(json.dumps([recipient, subject, SoakDate.today().isoformat()]) + '\n' for recipient in to_addrs)
+
+class FakeCredentials:
+    valid, expired = True, False
+
+    def to_json(self):
+        return json.dumps({'token': 'soak'})
+
+# --- Synthetic Workspace ---
+def write_master(path, people, rng):
+    rows = [{'Email ID': email, 'Location': location, 'SPOC': f"SPOC {rng.randrange(5)}"} for email, location in people]
+    pd.DataFrame(rows).to_excel(path, index=False)
+
+def build_workspace(task_count, cycles, sync_minutes, rng):
+    """Writes master workbooks and task_log.json into the current directory. Returns the ids the fakes serve."""
+    workbook_count = max(2, task_count // 40)
+    people = [(f"person{n}@example.com", f"Site {n % 7}") for n in range(MASTER_ROWS * workbook_count)]
+    masters = []
+    for n in range(workbook_count):
+        masters.append(f"master{n}.xlsx")
+        write_master(masters[-1], people[n * MASTER_ROWS:(n + 1) * MASTER_ROWS], rng)
+
+    today = SoakDate.today()
+    days = int(cycles * sync_minutes // 1440) + 2 # A cycle covers at most one sync interval of simulated time
+    trackers = [{'title': f"Tracker {n}", 'response_sheet_id': f"sheet{n}", 'master_excel': masters[n % workbook_count],
+                 'result_path': os.path.join('trackers', f"tracker{n}.xlsx"), 'output_formats': ['xlsx', 'csv'] if n % 5 == 0 else ['csv']}
+                for n in range(max(1, task_count // 10))]
+    config = {
+        'settings': {
+            'smtp_email': 'soak@example.com', 'smtp_password': 'soak', 'sync_interval_minutes': sync_minutes,
+            'api_rate_limits': {'drive': [10000, 10000], 'sheets': [10000, 10000], 'forms': [10000, 10000]},
+        },
+        'track_tasks': trackers,
+        'form_updater_tasks': [{'title': f"Form {n}", 'tracker_title': trackers[n % len(trackers)]['title'], 'form_link': f"https://docs.google.com/forms/d/form{n}/edit"}
+                               for n in range(task_count * 15 // 100)],
+        'reminders': [{'title': f"Reminder {n}", 'tracker_title': trackers[n % len(trackers)]['title'], 'start_date': today.strftime('%Y-%m-%d'),
+                       'end_date': (today + datetime.timedelta(days=days)).strftime('%Y-%m-%d'), 'frequency': 'Everyday', 'subject': f"Reminder {n}", 'message': 'Please upload.'}
+                      for n in range(task_count // 10)],
+        'drive_tasks': [{'title': f"Drive {n}", 'folder_id': f"https://drive.google.com/drive/folders/folder{n}", 'path': os.path.join('drive', f"folder{n}")}
+                        for n in range(task_count * 15 // 100)],
+    }
+    config['emails'] = [{'title': f"Email {n}", 'excel': masters[n % workbook_count], 'date': (today + datetime.timedelta(days=n % days)).strftime('%Y-%m-%d'), 'subject': f"Notice {n}", 'msg': 'Hello.'}
+                        for n in range(task_count - sum(len(config[kind]) for kind in ['track_tasks', 'form_updater_tasks', 'reminders', 'drive_tasks']))]
+    os.makedirs('trackers', exist_ok=True)
+    with open('task_log.json', 'w') as f:
+        json.dump(config, f, indent=4)
+    return people, masters, [task['response_sheet_id'] for task in trackers], [f"form{n}" for n in range(len(config['form_updater_tasks']))], [f"folder{n}" for n in range(len(config['drive_tasks']))]
+
+# --- Resource Sampling ---
+def get_rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) / 1024 for line in f if line.startswith('VmRSS:'))
+
+def get_open_handles():
+    if psutil is not None:
+        process = psutil.Process()
+        return process.num_handles() if hasattr(process, 'num_handles') else process.num_fds()
+    return len(os.listdir('/proc/self/fd'))
+
+class SoakRecorder:
+    """Times each cycle and samples RSS and open handles every `sample_every` cycles."""
+    def __init__(self, cycles, sample_every, report_path):
+        self.cycles, self.sample_every = cycles, sample_every
+        self.durations, self.samples = [], []
+        self.report = open(report_path, 'w')
+        self.report.write("cycle,simulated_time,rss_mb,open_handles,median_cycle_ms,emails_sent\n")
+
+    def record(self, duration):
+        self.durations.append(duration)
+        cycle = len(self.durations)
+        if cycle % self.sample_every == 0 or cycle == self.cycles:
+            gc.collect()
+            window = self.durations[-self.sample_every:]
+            sample = (cycle, SoakDateTime.now().isoformat(timespec='seconds'), get_rss_mb(), get_open_handles(), statistics.median(window) * 1000, FakeSMTP.sent)
+            self.samples.append(sample)
+            self.report.write(f"{sample[0]},{sample[1]},{sample[2]:.1f},{sample[3]},{sample[4]:.1f},{sample[5]}\n")
+            self.report.flush()
+            print(f"cycle {sample[0]:>6}  sim {sample[1]}  rss {sample[2]:8.1f} MB  handles {sample[3]:>4}  median cycle {sample[4]:8.1f} ms  emails {sample[5]}")
+        return cycle >= self.cycles
+
+# --- Harness ---
+def load_headless():
+    spec = importlib.util.spec_from_file_location('headless', HEADLESS_SCRIPT)
+    headless = importlib.util.module_from_spec(spec)
+    sys.modules['headless'] = headless
+    spec.loader.exec_module(headless)
+    return headless
+
+def install_fakes(headless, drive, sheets, forms):
+    headless.datetime = types.SimpleNamespace(**{name: getattr(datetime, name) for name in dir(datetime) if not name.startswith('__')})
+    headless.datetime.datetime, headless.datetime.date = SoakDateTime, SoakDate
+    headless.time = types.SimpleNamespace(**{name: getattr(time, name) for name in dir(time) if not name.startswith('__')})
+    headless.time.sleep = soak_sleep
+    headless.smtplib = types.SimpleNamespace(SMTP_SSL=FakeSMTP)
+    headless.get_creds = lambda: FakeCredentials()
+    services = {'drive': drive, 'sheets': sheets, 'forms': forms}
+    headless.get_service = lambda api, version, creds: services[api]
+    headless.MediaIoBaseDownload = FakeDownloader
+
+    class SoakDaemon(headless.Daemon):
+        def seconds_until_next(self):
+            CLOCK.advance(super().seconds_until_next())
+            return 0
+    headless.Daemon = SoakDaemon
+
+def check_thresholds(recorder, warmup, args):
+    """Returns the threshold violations, comparing the first sample after warm-up with the last one."""
+    baseline = next((sample for sample in recorder.samples if sample[0] >= warmup), None)
+    if baseline is None or baseline is recorder.samples[-1]:
+        return [f"Not enough samples after the {warmup}-cycle warm-up to compare; run more cycles."]
+    final, failures = recorder.samples[-1], []
+    if final[2] - baseline[2] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew by {final[2] - baseline[2]:.1f} MB (limit {args.max_rss_growth_mb} MB)")
+    if final[3] - baseline[3] > args.max_handle_growth:
+        failures.append(f"Open handles grew by {final[3] - baseline[3]} (limit {args.max_handle_growth})")
+    window = args.sample_every
+    first = statistics.median(recorder.durations[baseline[0] - window:baseline[0]])
+    last = statistics.median(recorder.durations[-window:])
+    if last > max(first, 0.01) * args.max_cycle_drift:
+        failures.append(f"Median cycle time drifted from {first * 1000:.1f} ms to {last * 1000:.1f} ms (limit x{args.max_cycle_drift})")
+    return failures
+
+# --- Multi-Process Check ---
+def run_process(index, rounds, workdir, barrier, sheet_ids, form_ids, folder_ids):
+    """Body of one --processes child: offers every task to run_due_tasks once per simulated day, in step with the other children."""
+    os.chdir(workdir)
+    headless = load_headless()
+    headless._console_handler.setLevel(logging.WARNING)
+    install_fakes(headless, FakeDrive(folder_ids), FakeSheets(sheet_ids), FakeForms(form_ids))
+    FakeSMTP.log_path = f"sent-{index}.jsonl"
+    config = headless.load_config()
+    headless.configure_service_limits(config.get('settings', {}))
+    task_keys = [(kind, task['title']) for kind in headless.TASK_KINDS for task in config.get(kind, [])]
+    try:
+        for day in range(rounds):
+            # Every child starts the day together, so they all compete for the same due tasks
+            barrier.wait()
+            CLOCK.offset = datetime.timedelta(days=day)
+            headless.run_due_tasks(config, task_keys)
+    finally:
+        headless.SHUTDOWN_EVENT.set()
+        headless.shutdown_tracker_pool()
+        headless.stop_log_listener()
+
+def check_exactly_once(process_count, expected):
+    """Returns the violations found in the children's send logs: messages sent twice and expected emails never sent."""
+    sent = collections.Counter()
+    for index in range(process_count):
+        path = f"sent-{index}.jsonl"
+        count = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    sent[tuple(json.loads(line))] += 1
+                    count += 1
+        print(f"process {index}: {count} messages")
+    failures = []
+    duplicates = [message for message, count in sent.items() if count > 1]
+    if duplicates:
+        failures.append(f"{len(duplicates)} message(s) were sent more than once, e.g. {duplicates[0]}")
+    missing = expected - set(sent)
+    if missing:
+        failures.append(f"{len(missing)} scheduled email(s) were never sent, e.g. {sorted(missing)[0]}")
+    return failures, sum(sent.values())
+
+def run_processes(args, workdir, rng):
+    """--processes mode: builds one workspace, runs the children against it, and checks every email went out exactly once."""
+    # One cycle is one simulated day, so the emails are spread over about as many days as there are cycles
+    people, masters, sheet_ids, form_ids, folder_ids = build_workspace(args.tasks, args.cycles, 1440, rng)
+    with open('task_log.json') as f:
+        config = json.load(f)
+    days = {(SoakDate.today() + datetime.timedelta(days=day)).isoformat() for day in range(args.cycles)}
+    recipients = {master: [email_addr for email_addr, _ in people[n * MASTER_ROWS:(n + 1) * MASTER_ROWS]] for n, master in enumerate(masters)}
+    expected = {(recipient, task['subject'], task['date']) for task in config['emails'] if task['date'] in days for recipient in recipients[task['excel']]}
+    print(f"Running {args.processes} processes over {args.tasks} tasks for {args.cycles} simulated days in {workdir}")
+
+    # 'spawn' so each child loads headless.py.py from scratch, like a separately started daemon
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(args.processes)
+    processes = [context.Process(target=run_process, args=(index, args.cycles, workdir, barrier, sheet_ids, form_ids, folder_ids)) for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    while any(process.is_alive() for process in processes):
+        # A child that died would leave the others waiting at the barrier forever
+        if any(process.exitcode not in (None, 0) for process in processes):
+            barrier.abort()
+        time.sleep(0.5)
+
+    failures = [f"Process {index} exited with code {process.exitcode}" for index, process in enumerate(processes) if process.exitcode != 0]
+    send_failures, total = check_exactly_once(args.processes, expected)
+    failures += send_failures
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"PASS: {total} messages from {args.processes} processes, each sent exactly once; all {len(expected)} scheduled emails sent")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-tests headless.py.py against local fakes on an accelerated clock.")
+    parser.add_argument('--cycles', type=int, default=2000, help="cycles to run (default 2000)")
+    parser.add_argument('--tasks', type=int, default=300, help="tasks in the synthetic task_log.json (default 300)")
+    parser.add_argument('--workdir', help="scratch directory (default: a new temporary directory)")
+    parser.add_argument('--sync-minutes', type=float, default=15, help="sync interval of Drive, Tracker and Form Updater tasks; longer intervals cover more simulated days (default 15)")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the simulated changes")
+    parser.add_argument('--sample-every', type=int, default=50, help="cycles between resource samples (default 50)")
+    parser.add_argument('--warmup', type=int, default=200, help="cycles before the baseline sample, while caches fill (default 200)")
+    parser.add_argument('--change-every', type=int, default=100, help="cycles between edits of a master workbook (default 100)")
+    parser.add_argument('--max-rss-growth-mb', type=float, default=50, help="allowed RSS growth after warm-up (default 50)")
+    parser.add_argument('--max-handle-growth', type=int, default=10, help="allowed growth in open file descriptors/handles (default 10)")
+    parser.add_argument('--processes', type=int, default=1, help="run this many processes against one state database instead, one simulated day per cycle, and check that no email is sent twice (default 1)")
+    parser.add_argument('--max-cycle-drift', type=float, default=2.0, help="allowed ratio of the final to the baseline median cycle time (default 2.0)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='headless-soak-')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir) # The daemon keeps its config, state, log and caches in the working directory
+    rng = random.Random(args.seed)
+    if args.processes > 1:
+        return run_processes(args, workdir, rng)
+    people, masters, sheet_ids, form_ids, folder_ids = build_workspace(args.tasks, args.cycles, args.sync_minutes, rng)
+    print(f"Soaking {args.tasks} tasks for {args.cycles} cycles in {workdir}")
+
+    headless = load_headless()
+    headless._console_handler.setLevel(logging.WARNING) # The full log still goes to automation.log
+    drive, sheets, forms = FakeDrive(folder_ids), FakeSheets(sheet_ids), FakeForms(form_ids)
+    install_fakes(headless, drive, sheets, forms)
+    recorder = SoakRecorder(args.cycles, args.sample_every, 'soak_report.csv')
+
+    run_due_tasks = headless.run_due_tasks
+    def timed_run_due_tasks(config, due_keys):
+        started = time.perf_counter()
+        retry_keys = run_due_tasks(config, due_keys)
+        if recorder.record(time.perf_counter() - started):
+            raise SoakFinished()
+        # Simulated activity between cycles: new form responses, changed Drive files and edited workbooks
+        sheets.add_response(rng, people)
+        drive.touch(rng)
+        if len(recorder.durations) % args.change_every == 0:
+            master = rng.choice(masters)
+            index = masters.index(master)
+            write_master(master, people[index * MASTER_ROWS:(index + 1) * MASTER_ROWS], rng)
+        return retry_keys
+    headless.run_due_tasks = timed_run_due_tasks
+
+    try:
+        headless.main()
+    except SoakFinished:
+        pass
+    finally:
+        headless.SHUTDOWN_EVENT.set()
+        headless.shutdown_tracker_pool()
+        headless.stop_log_listener()
+        recorder.report.close()
+
+    failures = check_thresholds(recorder, args.warmup, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"PASS: {args.cycles} cycles, {FakeSMTP.sent} emails, report in {os.path.join(workdir, 'soak_report.csv')}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())